@@ -1,4 +1,489 @@
-# api_client.py (Placeholder for future REST API integration)
-def sync_with_server():
-    # Implement API calls here
-    pass
+# api_client.py - incremental sync of the local database with a server.
+#
+# Writes to customers, transactions and customer_transactions are recorded
+# in the change_log table by triggers (see migrations._create_change_log),
+# from the moment a SyncClient is first created for the database.
+# SyncClient.push() sends only what changed since the last batch the server
+# acknowledged, as gzip-compressed JSON:
+#
+#   POST /sync/push
+#   {"device_id": "...", "from_seq": 41, "to_seq": 540,
+#    "changes": [{"table": "customers", "upserts": [{...row...}], "deletes": [["<device>", 7]]}, ...]}
+#
+# Local ids collide across devices, so rows travel under their origin, the
+# [device_id, id] of the device that created them (see
+# migrations._create_sync_ids): each upsert carries "origin" instead of
+# "id", and a ledger row "customer_origin" instead of "customer_id". The
+# server answers with {"acked_seq": 540}, and acknowledged entries are removed
+# from the change log. SyncClient.pull() fetches other devices' changes a
+# page at a time:
+#
+#   GET /sync/pull?since=1200&limit=1000&device_id=...
+#   {"changes": [...same shape as a push...], "next_cursor": 2200, "remaining": 5000}
+#
+# and applies each page in one transaction. Rows are matched to local ones by
+# origin; rows not seen before get a fresh local id. Ledger rows are upserted
+# and whichever version of a customer has the newer updated_at is kept.
+# Connections are kept alive in a process-wide pool, and network errors, 429
+# and 5xx responses are retried with exponential backoff.
+# sync_server.py is a local stand-in for the server.
+import gzip
+import http.client
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from migrations import SYNCED_TABLES
+
+SYNC_URL_ENV = 'SMART_CALC_SYNC_URL'
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 1000
+# Columns holding the local id of a row in another synced table, and the
+# field that carries that row's origin instead
+REFERENCES = {'customer_transactions': {'customer_id': ('customers', 'customer_origin')}}
+# Stands in for a reference to a row this device does not have
+_UNKNOWN = object()
+
+
+class SyncError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class _ConnectionPool:
+    # Idle keep-alive connections per (scheme, host, port), shared by every
+    # SyncClient in the process so repeated syncs skip the TCP/TLS handshake
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, scheme, host, port, timeout):
+        with self.lock:
+            connections = self.idle.get((scheme, host, port))
+            if connections:
+                connection = connections.pop()
+                connection.timeout = timeout
+                return connection
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(host, port, timeout=timeout)
+
+    def release(self, scheme, host, port, connection):
+        with self.lock:
+            connections = self.idle.setdefault((scheme, host, port), [])
+            if len(connections) < self.max_idle:
+                connections.append(connection)
+                return
+        connection.close()
+
+    def clear(self):
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+_pool = _ConnectionPool()
+
+
+def close_connections():
+    _pool.clear()
+
+
+class SyncReport:
+    def __init__(self):
+        self.batches = 0
+        self.changes = 0
+        self.rows_sent = 0
+        self.bytes_sent = 0
+        self.bytes_uncompressed = 0
+        self.pages = 0
+        self.rows_received = 0
+        self.rows_applied = 0
+        # Remote customer versions older than the local one, and ledger rows
+        # whose customer is gone, left unapplied
+        self.conflicts = 0
+        self.bytes_received = 0
+        self.elapsed = 0.0
+
+
+class SyncClient:
+    def __init__(self, db, base_url, batch_size=DEFAULT_BATCH_SIZE, page_size=DEFAULT_PAGE_SIZE, timeout=30,
+                 retries=5, backoff=0.5, max_backoff=60.0):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Invalid sync server URL: {base_url}")
+        self.db = db
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Called as on_retry(attempt, delay_seconds, error) before each retry
+        self.on_retry = None
+        self.cancelled = threading.Event()
+        self.columns = {}
+        self.device_id = self._device_id()
+        self._start_change_log()
+
+    def _device_id(self):
+        row = self.db.conn.execute("SELECT value FROM sync_state WHERE key = 'device_id'").fetchone()
+        if row:
+            return row[0]
+        device_id = uuid.uuid4().hex
+        with self.db.conn:
+            self.db.conn.execute("INSERT INTO sync_state (key, value) VALUES ('device_id', ?)", (device_id,))
+        return device_id
+
+    def _start_change_log(self):
+        # The triggers stay idle until sync is used; turning them on queues
+        # every row written so far, so it all reaches the server once
+        conn = self.db.conn
+        if conn.execute("SELECT value FROM sync_state WHERE key = 'log_changes'").fetchone()[0]:
+            return
+        with conn:
+            for table in SYNCED_TABLES:
+                conn.execute(f"INSERT INTO change_log (table_name, row_id, op) SELECT '{table}', id, 'insert' "
+                             f"FROM {table}")
+            conn.execute("UPDATE sync_state SET value = 1 WHERE key = 'log_changes'")
+
+    def last_pushed_seq(self):
+        return self.db.conn.execute("SELECT value FROM sync_state WHERE key = 'last_pushed_seq'").fetchone()[0]
+
+    def pending_changes(self):
+        return self.db.conn.execute('SELECT COUNT(*) FROM change_log').fetchone()[0]
+
+    def collect_batch(self):
+        # Returns the next payload to push, or None when the log is empty.
+        # Several changes to one row collapse into a single upsert or delete.
+        entries = self.db.conn.execute(
+            'SELECT seq, table_name, row_id, op FROM change_log ORDER BY seq LIMIT ?',
+            (self.batch_size,)).fetchall()
+        if not entries:
+            return None
+        first_ops = {}
+        last_ops = {}
+        for seq, table, row_id, op in entries:
+            first_ops.setdefault((table, row_id), op)
+            last_ops[(table, row_id)] = op
+
+        changes = []
+        for table in SYNCED_TABLES:
+            upsert_ids = []
+            deletes = []
+            for (row_table, row_id), op in last_ops.items():
+                if row_table != table:
+                    continue
+                if op != 'delete':
+                    upsert_ids.append(row_id)
+                elif first_ops[(table, row_id)] != 'insert':
+                    # Rows created and deleted again before a push never
+                    # reached the server
+                    deletes.append(row_id)
+            upserts = self._fetch_rows(table, upsert_ids)
+            # Deleted since the change was logged; a later entry says so
+            found = {row['id'] for row in upserts}
+            deletes.extend(row_id for row_id in upsert_ids if row_id not in found
+                           and first_ops[(table, row_id)] != 'insert')
+            if upserts or deletes:
+                origins = self._origins(table, sorted(found) + deletes)
+                for row in upserts:
+                    row['origin'] = origins[row.pop('id')]
+                for column, (target, field) in REFERENCES.get(table, {}).items():
+                    targets = self._origins(target, sorted({row[column] for row in upserts} - {None}))
+                    for row in upserts:
+                        row[field] = targets.get(row.pop(column))
+                changes.append({'table': table, 'upserts': upserts,
+                                'deletes': [origins[row_id] for row_id in sorted(deletes)]})
+
+        return {
+            'device_id': self.device_id,
+            'from_seq': entries[0][0],
+            'to_seq': entries[-1][0],
+            'changes': changes,
+        }
+
+    def _fetch_rows(self, table, row_ids):
+        rows = []
+        for start in range(0, len(row_ids), DEFAULT_BATCH_SIZE):
+            chunk = row_ids[start:start + DEFAULT_BATCH_SIZE]
+            cursor = self.db.conn.execute(
+                f"SELECT * FROM {table} WHERE id IN ({', '.join('?' * len(chunk))}) ORDER BY id", chunk)
+            columns = [column[0] for column in cursor.description]
+            rows.extend(dict(zip(columns, row)) for row in cursor.fetchall())
+        return rows
+
+    def _origins(self, table, row_ids):
+        # Maps local ids to [device_id, id] origins: rows pulled from another
+        # device keep that device's identity, the rest are this device's own
+        origins = {row_id: [self.device_id, row_id] for row_id in row_ids}
+        for start in range(0, len(row_ids), DEFAULT_BATCH_SIZE):
+            chunk = row_ids[start:start + DEFAULT_BATCH_SIZE]
+            cursor = self.db.conn.execute(
+                f"SELECT row_id, origin_device, origin_id FROM sync_ids "
+                f"WHERE table_name = ? AND row_id IN ({', '.join('?' * len(chunk))})", [table] + chunk)
+            for row_id, device, origin_id in cursor:
+                origins[row_id] = [device, origin_id]
+        return origins
+
+    def acknowledge(self, acked_seq):
+        with self.db.conn:
+            self.db.conn.execute('DELETE FROM change_log WHERE seq <= ?', (acked_seq,))
+            self.db.conn.execute("UPDATE sync_state SET value = ? WHERE key = 'last_pushed_seq'", (acked_seq,))
+
+    def push(self, progress=None, report=None):
+        # Pushes the change log in batches until it is empty. progress, if
+        # given, is called as progress(changes_sent, changes_pending) after
+        # every acknowledged batch.
+        report = report or SyncReport()
+        start = time.perf_counter()
+        total = self.pending_changes()
+        while True:
+            payload = self.collect_batch()
+            if payload is None:
+                break
+            body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+            compressed = gzip.compress(body)
+            response, _ = self._request_with_retry('POST', '/sync/push', compressed)
+            acked_seq = response.get('acked_seq')
+            if not isinstance(acked_seq, int) or acked_seq < payload['from_seq']:
+                raise SyncError(f"Server did not acknowledge changes {payload['from_seq']}-{payload['to_seq']}",
+                                retryable=False)
+            self.acknowledge(min(acked_seq, payload['to_seq']))
+
+            report.batches += 1
+            report.changes = total - self.pending_changes()
+            report.rows_sent += sum(len(change['upserts']) + len(change['deletes'])
+                                    for change in payload['changes'])
+            report.bytes_sent += len(compressed)
+            report.bytes_uncompressed += len(body)
+            if progress:
+                progress(report.changes, total)
+        report.elapsed += time.perf_counter() - start
+        return report
+
+    def pull_cursor(self):
+        return self.db.conn.execute("SELECT value FROM sync_state WHERE key = 'pull_cursor'").fetchone()[0]
+
+    def pull(self, progress=None, report=None):
+        # Fetches and applies remote changes until the server has no more.
+        # progress, if given, is called as progress(rows_received, rows_total).
+        report = report or SyncReport()
+        start = time.perf_counter()
+        while True:
+            since = self.pull_cursor()
+            query = urlencode({'since': since, 'limit': self.page_size, 'device_id': self.device_id})
+            response, size = self._request_with_retry('GET', f"/sync/pull?{query}")
+            changes = response.get('changes')
+            next_cursor = response.get('next_cursor')
+            if not isinstance(changes, list) or not isinstance(next_cursor, int):
+                raise SyncError("Sync server sent an invalid page", retryable=False)
+            applied, conflicts = self.apply_changes(changes, next_cursor)
+
+            report.pages += 1
+            report.rows_received += sum(len(change.get('upserts', ())) + len(change.get('deletes', ()))
+                                        for change in changes)
+            report.rows_applied += applied
+            report.conflicts += conflicts
+            report.bytes_received += size
+            remaining = response.get('remaining', 0)
+            if progress:
+                progress(report.rows_received, report.rows_received + remaining)
+            if not remaining or next_cursor <= since:
+                break
+        report.elapsed += time.perf_counter() - start
+        return report
+
+    def sync(self, progress=None):
+        report = self.push(progress)
+        return self.pull(progress, report)
+
+    def _table_columns(self, table):
+        if table not in self.columns:
+            self.columns[table] = [row[1] for row in self.db.conn.execute(f'PRAGMA table_info({table})')]
+        return self.columns[table]
+
+    def _local_ids(self, table, origins):
+        # Maps (device_id, id) origins to the local ids of the rows already
+        # here; this device's own rows are found by id, others via sync_ids
+        local_ids = {}
+        by_device = {}
+        for device, origin_id in origins:
+            if device == self.device_id:
+                local_ids[(device, origin_id)] = origin_id
+            else:
+                by_device.setdefault(device, []).append(origin_id)
+        for device, origin_ids in by_device.items():
+            for start in range(0, len(origin_ids), DEFAULT_BATCH_SIZE):
+                chunk = origin_ids[start:start + DEFAULT_BATCH_SIZE]
+                cursor = self.db.conn.execute(
+                    f"SELECT origin_id, row_id FROM sync_ids WHERE table_name = ? AND origin_device = ? "
+                    f"AND origin_id IN ({', '.join('?' * len(chunk))})", [table, device] + chunk)
+                for origin_id, row_id in cursor:
+                    local_ids[(device, origin_id)] = row_id
+        return local_ids
+
+    def _map_new_rows(self, table, origins):
+        # Gives rows first seen from another device the next free local ids,
+        # the way data_io's importer allocates them
+        conn = self.db.conn
+        row = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+        next_id = max(row[0] if row else 0, conn.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0] or 0) + 1
+        local_ids = {origin: next_id + offset for offset, origin in enumerate(origins)}
+        conn.executemany('INSERT INTO sync_ids (table_name, row_id, origin_device, origin_id) VALUES (?, ?, ?, ?)',
+                         [(table, row_id, device, origin_id) for (device, origin_id), row_id in local_ids.items()])
+        return local_ids
+
+    def _resolve_rows(self, table, upserts):
+        # Returns (origin, row, reference ids) for each row, with the origins
+        # in the row's reference fields mapped to local ids. Rows referring
+        # to a row this device never received, or has since had deleted
+        # remotely, are left out.
+        resolved = [(tuple(row['origin']), row, []) for row in upserts]
+        for target, field in REFERENCES.get(table, {}).values():
+            local_ids = self._local_ids(target, {tuple(row[field]) for row in upserts if row.get(field) is not None})
+            for _, row, ids in resolved:
+                reference = row.get(field)
+                ids.append(None if reference is None else local_ids.get(tuple(reference), _UNKNOWN))
+        return [(origin, row, tuple(ids)) for origin, row, ids in resolved
+                if all(row_id is not _UNKNOWN for row_id in ids)]
+
+    def apply_changes(self, changes, next_cursor):
+        # Applies one page of remote changes and moves the pull cursor in a
+        # single transaction; returns (rows_applied, conflicts)
+        by_table = {change.get('table'): change for change in changes}
+        unknown = set(by_table) - set(SYNCED_TABLES)
+        if unknown:
+            raise SyncError(f"Sync server sent changes for unknown table(s): {', '.join(map(str, unknown))}",
+                            retryable=False)
+        applied = conflicts = 0
+        conn = self.db.conn
+        with conn:
+            # Keeps the change log triggers from queueing these rows for push
+            conn.execute("UPDATE sync_state SET value = 0 WHERE key = 'log_changes'")
+            for table in SYNCED_TABLES:
+                change = by_table.get(table)
+                if not change:
+                    continue
+                upserts = change.get('upserts') or []
+                try:
+                    rows = self._resolve_rows(table, upserts)
+                    deletes = self._local_ids(table, [tuple(origin) for origin in change.get('deletes') or []])
+                except (KeyError, TypeError, ValueError):
+                    raise SyncError(f"Sync server sent {table} changes without a valid origin", retryable=False)
+                conflicts += len(upserts) - len(rows)
+                if rows:
+                    local_ids = self._local_ids(table, [origin for origin, _, _ in rows])
+                    local_ids.update(self._map_new_rows(
+                        table, [origin for origin, _, _ in rows if origin not in local_ids]))
+                    references = list(REFERENCES.get(table, {}))
+                    columns = [column for column in self._table_columns(table)
+                               if column in rows[0][1] and column != 'id' and column not in references]
+                    updates = ', '.join(f"{column} = excluded.{column}" for column in columns + references)
+                    sql = (f"INSERT INTO {table} (id, {', '.join(columns + references)}) "
+                           f"VALUES ({', '.join('?' * (len(columns) + len(references) + 1))}) "
+                           f"ON CONFLICT (id) DO UPDATE SET {updates}")
+                    if table == 'customers':
+                        # Last writer wins; a tie goes to the server
+                        sql += (" WHERE COALESCE(excluded.updated_at, excluded.created_at, '')"
+                                " >= COALESCE(customers.updated_at, customers.created_at, '')")
+                    cursor = conn.executemany(sql, [(local_ids[origin],) + tuple(row.get(column) for column in columns)
+                                                    + reference_ids for origin, row, reference_ids in rows])
+                    applied += cursor.rowcount
+                    conflicts += len(rows) - cursor.rowcount
+                if deletes:
+                    row_ids = list(deletes.values())
+                    cursor = conn.executemany(f'DELETE FROM {table} WHERE id = ?', [(row_id,) for row_id in row_ids])
+                    applied += cursor.rowcount
+                    conn.executemany('DELETE FROM sync_ids WHERE table_name = ? AND row_id = ?',
+                                     [(table, row_id) for row_id in row_ids])
+            conn.execute("UPDATE sync_state SET value = 1 WHERE key = 'log_changes'")
+            conn.execute("UPDATE sync_state SET value = ? WHERE key = 'pull_cursor'", (next_cursor,))
+        return applied, conflicts
+
+    def cancel(self):
+        # Abandons a push that is waiting to retry; safe from any thread
+        self.cancelled.set()
+
+    def _request_with_retry(self, method, path, body=None):
+        attempt = 0
+        while True:
+            if self.cancelled.is_set():
+                raise SyncError("Sync cancelled", retryable=False)
+            try:
+                return self._request(method, path, body)
+            except SyncError as e:
+                if not e.retryable or attempt >= self.retries:
+                    raise
+                error = e
+            # Full jitter keeps many clients from retrying in lockstep
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            if self.on_retry:
+                self.on_retry(attempt, delay, error)
+            if self.cancelled.wait(delay):
+                raise SyncError("Sync cancelled", retryable=False)
+
+    def _request(self, method, path, body=None):
+        # Returns the decoded JSON response and its size on the wire
+        headers = {
+            'Accept-Encoding': 'gzip',
+            'X-Device-Id': self.device_id,
+        }
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+            headers['Content-Encoding'] = 'gzip'
+        # A pooled connection the server has since closed fails on first
+        # use; retry once on a fresh one
+        for attempt in range(2):
+            connection = _pool.acquire(self.scheme, self.host, self.port, self.timeout)
+            try:
+                connection.request(method, self.base_path + path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                connection.close()
+                if attempt:
+                    raise SyncError(f"Sync server closed the connection: {e}")
+                continue
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                raise SyncError(f"Could not reach sync server: {e}")
+            break
+        if response.will_close:
+            connection.close()
+        else:
+            _pool.release(self.scheme, self.host, self.port, connection)
+        size = len(data)
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        if response.status != 200:
+            raise SyncError(f"Sync server returned {response.status}: {data[:200].decode('utf-8', 'replace')}",
+                            retryable=response.status == 429 or response.status >= 500)
+        try:
+            return json.loads(data), size
+        except ValueError:
+            raise SyncError("Sync server returned invalid JSON", retryable=False)
+
+
+def sync_with_server(db=None, base_url=None, progress=None):
+    # Pushes pending local changes to base_url (default: $SMART_CALC_SYNC_URL)
+    # and pulls everything other devices pushed since the last sync
+    base_url = base_url or os.environ.get(SYNC_URL_ENV)
+    if not base_url:
+        raise SyncError(f"No sync server configured; set {SYNC_URL_ENV}")
+    if db is None:
+        from db_manager import DBManager
+        db = DBManager()
+    return SyncClient(db, base_url).sync(progress)
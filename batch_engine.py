@@ -0,0 +1,106 @@
+# Vectorized evaluation of many calculations at once with NumPy.
+#
+#   result = evaluate_batch([100, 250, 9], ['*', '-', 'sqrt'], [0.9, 20, None])
+#   result.values       -> array([90., 230., 3.])
+#   result.errors       -> array([False, False, False])
+#
+# Each element applies ops[i] to left[i] (and right[i] for binary ops):
+#
+#   + - * /     arithmetic
+#   ^           left ** right
+#   sqrt, log   square root and base-10 logarithm of left
+#   pow         left ** right, or left squared when right is missing, like
+#               the x² button
+#
+# Instead of the "Error" string the calculator shows, failing elements get
+# NaN in values and are flagged in one boolean mask per error kind. A missing
+# or NaN left operand, or right operand of a binary op, is flagged as
+# missing_operand.
+import numpy as np
+
+# pow is in neither: its right operand is optional
+BINARY_OPS = ('+', '-', '*', '/', '^')
+UNARY_OPS = ('sqrt', 'log')
+ERROR_KINDS = ('division_by_zero', 'domain', 'overflow', 'unknown_operation', 'missing_operand')
+
+
+class BatchResult:
+    def __init__(self, values, masks):
+        self.values = values
+        self.masks = masks
+
+    @property
+    def errors(self):
+        # True wherever any error kind applies
+        combined = np.zeros(self.values.shape, dtype=bool)
+        for mask in self.masks.values():
+            combined |= mask
+        return combined
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _as_array(values, size):
+    # None entries (e.g. no right operand for sqrt) become NaN
+    if values is None:
+        return np.full(size, np.nan)
+    array = np.array(values, dtype=float)
+    if array.ndim == 0:
+        return np.full(size, float(array))
+    return array
+
+
+def evaluate_batch(left, ops, right=None):
+    left = np.atleast_1d(np.array(left, dtype=float))
+    size = left.shape[0]
+    ops = np.asarray(ops, dtype=str)
+    if ops.ndim == 0:
+        ops = np.full(size, str(ops))
+    right = _as_array(right, size)
+    if ops.shape != (size,) or right.shape != (size,):
+        raise ValueError("left, ops and right must have the same length")
+
+    values = np.full(size, np.nan)
+    masks = {kind: np.zeros(size, dtype=bool) for kind in ERROR_KINDS}
+    masks['missing_operand'] = np.isnan(left) | (np.isin(ops, BINARY_OPS) & np.isnan(right))
+
+    with np.errstate(all='ignore'):
+        for op in np.unique(ops).tolist():
+            selected = ops == op
+            a = left[selected]
+            b = right[selected]
+            if op == '+':
+                out = a + b
+            elif op == '-':
+                out = a - b
+            elif op == '*':
+                out = a * b
+            elif op == '/':
+                masks['division_by_zero'][selected] = b == 0
+                out = a / b
+            elif op in ('^', 'pow'):
+                if op == 'pow':
+                    b = np.where(np.isnan(b), 2.0, b)
+                masks['division_by_zero'][selected] = (a == 0) & (b < 0)
+                masks['domain'][selected] = (a < 0) & (b != np.floor(b))
+                out = np.power(a, b)
+            elif op == 'sqrt':
+                masks['domain'][selected] = a < 0
+                out = np.sqrt(a)
+            elif op == 'log':
+                masks['domain'][selected] = a <= 0
+                out = np.log10(a)
+            else:
+                masks['unknown_operation'][selected] = True
+                continue
+            values[selected] = out
+
+    # Finite inputs that produced an infinite result overflowed
+    finite_inputs = np.isfinite(left) & (np.isfinite(right) | np.isin(ops, UNARY_OPS + ('pow',)))
+    masks['overflow'] |= (np.isinf(values) & finite_inputs
+                          & ~masks['division_by_zero'] & ~masks['domain'])
+
+    result = BatchResult(values, masks)
+    values[result.errors] = np.nan
+    return result
@@ -0,0 +1,46 @@
+# Compare per-row commits against DBManager.batch() group commits.
+#
+#   python benchmarks/bench_batch_writes.py --rows 2000
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_manager import DBManager
+
+
+def insert_rows(db, rows):
+    for i in range(rows):
+        db.add_customer_transaction(1, 10.0 + i, 'credit' if i % 2 else 'debit', f"row {i}")
+
+
+def measure(label, rows, batch_kwargs=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, 'bench.db'))
+        start = time.perf_counter()
+        if batch_kwargs is None:
+            insert_rows(db, rows)
+        else:
+            with db.batch(**batch_kwargs):
+                insert_rows(db, rows)
+        elapsed = time.perf_counter() - start
+        db.conn.close()
+    print(f"{label:<28} {rows / elapsed:>12,.0f} rows/s  ({elapsed:.3f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    measure("commit per row", args.rows)
+    measure("batch()", args.rows, {})
+    measure("batch(max_rows=500)", args.rows, {'max_rows': 500})
+    measure("batch(max_delay=0.05)", args.rows, {'max_delay': 0.05})
+
+
+if __name__ == '__main__':
+    main()
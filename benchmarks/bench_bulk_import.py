@@ -0,0 +1,66 @@
+# Generate a synthetic export file and time data_io.import_data on it.
+#
+#   python benchmarks/bench_bulk_import.py --customers 100000 --transactions 900000 --format csv
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_io
+from db_manager import DBManager
+
+
+def synthetic_records(customers, transactions, seed=0):
+    rng = random.Random(seed)
+    for i in range(1, customers + 1):
+        yield 'customer', {'id': i, 'name': f"Customer {i}", 'phone': f"555{i:07d}",
+                           'email': f"customer{i}@example.com", 'address': None,
+                           'created_at': '2025-01-01 00:00:00'}
+    for i in range(1, transactions + 1):
+        yield 'transaction', {'id': i, 'customer_id': rng.randint(1, customers),
+                              'amount': round(rng.uniform(1, 500), 2),
+                              'type': rng.choice(('credit', 'debit')), 'description': f"entry {i}",
+                              'timestamp': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00"}
+
+
+def write_file(path, fmt, records):
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            writer = csv.DictWriter(handle, data_io.CSV_FIELDS)
+            writer.writeheader()
+            for record, row in records:
+                writer.writerow({'record': record, **row})
+        else:
+            for record, row in records:
+                handle.write(json.dumps({'record': record, **row}) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--customers', type=int, default=100000)
+    parser.add_argument('--transactions', type=int, default=900000)
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"import.{args.format}")
+        write_file(path, args.format, synthetic_records(args.customers, args.transactions))
+        db = DBManager(os.path.join(tmp, 'bench.db'))
+        report = data_io.import_data(db, path, args.format)
+        db.conn.close()
+
+    print(f"customers inserted    {report.customers_inserted:>10,}")
+    print(f"transactions inserted {report.transactions_inserted:>10,}")
+    print(f"transactions skipped  {report.transactions_skipped:>10,}")
+    print(f"rejected              {report.rejected:>10,}")
+    print(f"elapsed               {report.elapsed:>10.2f}s")
+    print(f"throughput            {report.rows_per_second:>10,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
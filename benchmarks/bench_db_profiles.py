@@ -0,0 +1,96 @@
+# Insert and read latency for each connection profile while a writer and
+# several readers share the same database file.
+#
+#   python benchmarks/bench_db_profiles.py --seconds 3 --readers 2
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_manager import CONNECTION_PROFILES, DBManager
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float('nan')
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def writer(path, profile, stop, latencies):
+    db = DBManager(path, profile)
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            db.add_customer_transaction(1 + i % 50, 1.0 + i, 'credit', f"row {i}")
+        except sqlite3.OperationalError:
+            continue
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    db.conn.close()
+
+
+def reader(path, profile, stop, latencies):
+    db = DBManager(path, profile)
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            db.get_transactions()
+            db.get_customer_transactions(1 + i % 50)
+        except sqlite3.OperationalError:
+            continue
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    db.conn.close()
+
+
+def run_profile(profile, seconds, readers):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        seed = DBManager(path, profile)
+        with seed.batch():
+            for i in range(5000):
+                seed.add_transaction(float(i), f"seed {i}")
+                seed.add_customer_transaction(1 + i % 50, float(i), 'debit', f"seed {i}")
+        seed.conn.close()
+
+        stop = threading.Event()
+        write_latencies, read_latencies = [], []
+        threads = [threading.Thread(target=writer, args=(path, profile, stop, write_latencies))]
+        threads += [threading.Thread(target=reader, args=(path, profile, stop, read_latencies))
+                    for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    for label, samples in (("insert", write_latencies), ("read", read_latencies)):
+        print(f"{profile:<9} {label:<7} n={len(samples):<7} "
+              f"p50={percentile(samples, 50) * 1000:7.3f}ms "
+              f"p99={percentile(samples, 99) * 1000:7.3f}ms "
+              f"mean={statistics.fmean(samples) * 1000 if samples else float('nan'):7.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--profile', choices=list(CONNECTION_PROFILES), action='append')
+    args = parser.parse_args()
+
+    for profile in args.profile or CONNECTION_PROFILES:
+        run_profile(profile, args.seconds, args.readers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# Launch the GUI repeatedly and report time-to-first-paint.
+#
+#   QT_QPA_PLATFORM=offscreen python benchmarks/bench_startup.py --runs 10
+#
+# "in-process" is measured by main.py from its first line to the first
+# paint event; "wall" also includes interpreter startup.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once():
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), '--startup-time'],
+                            cwd=ROOT, capture_output=True, text=True, timeout=60)
+    wall = time.perf_counter() - start
+    for line in result.stdout.splitlines():
+        if line.startswith('time-to-first-paint:'):
+            return float(line.split()[1]), wall * 1000
+    raise RuntimeError(f"main.py did not report a first paint:\n{result.stdout}{result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    samples = [run_once() for _ in range(args.runs)]
+    for label, values in (("in-process", [s[0] for s in samples]), ("wall", [s[1] for s in samples])):
+        print(f"{label:<11} median={statistics.median(values):7.1f} ms  "
+              f"min={min(values):7.1f} ms  max={max(values):7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# Time SyncClient.pull applying remote changes from the local stand-in server.
+#
+#   python benchmarks/bench_sync_pull.py --changes 100000 --page-size 1000
+#
+# The server is seeded with customers and ledger entries from another
+# device; with --conflicts, that many of those customers were pulled before
+# and have since been edited locally, so their older remote versions are
+# skipped.
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_client import SyncClient
+from db_manager import DBManager
+from sync_server import SyncServer
+
+
+def remote_changes(changes, seed=0):
+    rng = random.Random(seed)
+    customers = max(1, changes // 10)
+    customer_rows = [{'origin': ['central', i], 'name': f"Customer {i}", 'phone': f"555{i:07d}",
+                      'email': f"customer{i}@example.com",
+                      'address': None, 'created_at': '2025-01-01 00:00:00', 'updated_at': '2025-01-01 00:00:00.000'}
+                     for i in range(1, customers + 1)]
+    ledger_rows = []
+    for i in range(1, changes - customers + 1):
+        cents = rng.randint(100, 50000)
+        ledger_rows.append({'origin': ['central', i], 'customer_origin': ['central', rng.randint(1, customers)],
+                            'amount': cents / 100,
+                            'amount_cents': cents, 'type': rng.choice(('credit', 'debit')),
+                            'description': f"entry {i}",
+                            'timestamp': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00"})
+    return [{'table': 'customers', 'upserts': customer_rows, 'deletes': []},
+            {'table': 'customer_transactions', 'upserts': ledger_rows, 'deletes': []}]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--changes', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--conflicts', type=int, default=0)
+    parser.add_argument('--profile', default='balanced', choices=('safe', 'balanced', 'fast'))
+    args = parser.parse_args()
+
+    server = SyncServer().start()
+    server.store.apply_push({'device_id': 'central', 'to_seq': 0, 'changes': remote_changes(args.changes)})
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, 'bench.db'), args.profile)
+        with db.batch():
+            for i in range(args.conflicts):
+                local_id = db.add_customer(f"Local {i + 1}", None, None, None)
+                db.conn.execute("INSERT INTO sync_ids (table_name, row_id, origin_device, origin_id) "
+                                "VALUES ('customers', ?, 'central', ?)", (local_id, i + 1))
+        client = SyncClient(db, server.url, page_size=args.page_size)
+        client.push()
+        report = client.pull()
+        problems = db.verify_balances()
+        db.conn.close()
+    server.stop()
+
+    print(f"pages                 {report.pages:>10,}")
+    print(f"rows received         {report.rows_received:>10,}")
+    print(f"rows applied          {report.rows_applied:>10,}")
+    print(f"conflicts             {report.conflicts:>10,}")
+    print(f"bytes received        {report.bytes_received:>10,}")
+    print(f"elapsed               {report.elapsed:>10.2f}s")
+    print(f"throughput            {report.rows_received / report.elapsed:>10,.0f} rows/s")
+    print(f"balance mismatches    {len(problems):>10,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Export a ledger and import the same file back several times, in every
+# format, and fail if any import adds entries or changes a balance. The
+# ledger includes the descriptions import cleans: empty, missing and
+# space-padded ones.
+#
+#   python benchmarks/check_import_roundtrip.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_io
+from db_manager import DBManager
+
+DESCRIPTIONS = ('', 'coffee ', ' rent', None, 'groceries')
+IMPORTS = 3
+
+
+def snapshot(db):
+    balances = db.conn.execute('SELECT customer_id, balance_cents FROM customer_balances ORDER BY customer_id')
+    return db.count_rows('customer_transactions'), balances.fetchall()
+
+
+def check(tmp, fmt):
+    db = DBManager(os.path.join(tmp, f"{fmt}.db"))
+    customer = db.add_customer('Alice', '111', 'alice@example.com', None)
+    for i, description in enumerate(DESCRIPTIONS):
+        db.add_customer_transaction(customer, i + 1, 'credit' if i % 2 else 'debit', description)
+    path = os.path.join(tmp, f"export.{fmt}")
+    data_io.export_data(db, path, fmt)
+    expected = snapshot(db)
+
+    failures = []
+    for attempt in range(1, IMPORTS + 1):
+        report = data_io.import_data(db, path, fmt)
+        actual = snapshot(db)
+        if actual != expected or report.transactions_inserted:
+            failures.append(f"{fmt} import {attempt}: inserted {report.transactions_inserted}, "
+                            f"skipped {report.transactions_skipped}; ledger is {actual}, expected {expected}")
+    failures.extend(f"{fmt}: {problem}" for problem in db.verify_balances())
+    db.conn.close()
+    return failures
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in data_io.EXPORT_FORMATS:
+            failures += check(tmp, fmt)
+
+    if failures:
+        print("Re-imported ledger entries:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"Importing each export {IMPORTS} times left every ledger unchanged")
+
+
+if __name__ == '__main__':
+    main()
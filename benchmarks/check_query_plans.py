@@ -0,0 +1,64 @@
+# Run the hot DBManager read paths and fail if any statement they issue
+# falls back to a full table scan or a temporary sort.
+#
+#   python benchmarks/check_query_plans.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_manager import DBManager
+
+HOT_PATHS = {
+    'get_transactions': lambda db: db.get_transactions(),
+    'get_customer_transactions': lambda db: db.get_customer_transactions(1),
+    'get_transactions_page': lambda db: db.get_transactions_page(cursor=('2025-01-01 00:00:00', 1)),
+    'get_customer_transactions_page': lambda db: db.get_customer_transactions_page(
+        1, cursor=('2025-01-01 00:00:00', 1)),
+    'search_customers': lambda db: db.search_customers('ab'),
+    'get_customers_page': lambda db: db.get_customers_page(cursor=('ab', 1)),
+}
+
+
+def is_slow(detail):
+    if 'TEMP B-TREE' in detail:
+        return True
+    return detail.startswith('SCAN') and 'USING' not in detail
+
+
+def check(db, name, call):
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        call(db)
+    finally:
+        db.conn.set_trace_callback(None)
+
+    failures = []
+    for sql in statements:
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        plan = db.explain_query_plan(sql)
+        print(f"{name}: {' | '.join(plan)}")
+        failures += [f"{name}: {detail}" for detail in plan if is_slow(detail)]
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, 'plans.db'))
+        failures = []
+        for name, call in HOT_PATHS.items():
+            failures += check(db, name, call)
+        db.conn.close()
+
+    if failures:
+        print("\nUnindexed query plans:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Sync two devices through the local stand-in server and fail if a row from
+# one device lands on, updates or deletes a row of the other. Both devices
+# start numbering customers and ledger entries at 1, so every id collides.
+#
+#   python benchmarks/check_sync_identity.py
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_client import SyncClient
+from db_manager import DBManager
+from sync_server import SyncServer
+
+
+def snapshot(db):
+    customers = db.conn.execute('''
+        SELECT c.name, c.phone, c.address, b.balance_cents
+        FROM customers c LEFT JOIN customer_balances b ON b.customer_id = c.id
+        ORDER BY c.name
+    ''').fetchall()
+    ledger = db.conn.execute('''
+        SELECT c.name, t.amount_cents, t.type, t.description
+        FROM customer_transactions t LEFT JOIN customers c ON c.id = t.customer_id
+        ORDER BY c.name, t.description
+    ''').fetchall()
+    return customers, ledger
+
+
+def customer_id(db, name):
+    return db.conn.execute('SELECT id FROM customers WHERE name = ?', (name,)).fetchone()[0]
+
+
+def check(step, devices, expected):
+    failures = []
+    for name, db in zip(('first device', 'second device'), devices):
+        actual = snapshot(db)
+        if actual != expected:
+            failures.append(f"{step}: {name} has {actual}, expected {expected}")
+        failures.extend(f"{step}: {name}: {problem}" for problem in db.verify_balances())
+    return failures
+
+
+def run(devices, clients):
+    # Returns the failures of the first step that goes wrong
+    alice_device, bob_device = devices
+
+    def sync_all():
+        for client in clients + clients:
+            client.sync()
+
+    # Alice is customer 1 on the first device and Bob customer 1 on the second
+    alice = alice_device.add_customer('Alice', '111', None, None)
+    alice_device.add_customer_transaction(alice, 10, 'credit', 'alice 1')
+    alice_device.add_customer_transaction(alice, 5, 'credit', 'alice 2')
+    bob = bob_device.add_customer('Bob', '222', None, None)
+    bob_device.add_customer_transaction(bob, 3, 'debit', 'bob 1')
+    sync_all()
+    failures = check('both customers created', devices, (
+        [('Alice', '111', None, 1500), ('Bob', '222', None, -300)],
+        [('Alice', 1000, 'credit', 'alice 1'), ('Alice', 500, 'credit', 'alice 2'),
+         ('Bob', 300, 'debit', 'bob 1')]))
+    if failures:
+        return failures
+
+    # The second device edits Alice and adds to her ledger under its own ids
+    bob_device.update_customer(customer_id(bob_device, 'Alice'), 'Alice', '111', None, 'Main St')
+    bob_device.add_customer_transaction(customer_id(bob_device, 'Alice'), 2, 'debit', 'alice 3')
+    sync_all()
+    failures = check('Alice edited remotely', devices, (
+        [('Alice', '111', 'Main St', 1300), ('Bob', '222', None, -300)],
+        [('Alice', 1000, 'credit', 'alice 1'), ('Alice', 500, 'credit', 'alice 2'),
+         ('Alice', 200, 'debit', 'alice 3'), ('Bob', 300, 'debit', 'bob 1')]))
+    if failures:
+        return failures
+
+    # Deleting Bob (id 1 on the second device) must not touch Alice (id 1 on
+    # the first)
+    bob_device.conn.execute('DELETE FROM customer_transactions WHERE customer_id = ?', (bob,))
+    bob_device.delete_customer(bob)
+    sync_all()
+    failures = check('Bob deleted', devices, (
+        [('Alice', '111', 'Main St', 1300)],
+        [('Alice', 1000, 'credit', 'alice 1'), ('Alice', 500, 'credit', 'alice 2'),
+         ('Alice', 200, 'debit', 'alice 3')]))
+    if failures:
+        return failures
+
+    # A ledger entry created on one device and deleted on the other
+    bob_device.conn.execute("DELETE FROM customer_transactions WHERE description = 'alice 1'")
+    bob_device.conn.commit()
+    sync_all()
+    return check('remote entry deleted', devices, (
+        [('Alice', '111', 'Main St', 300)],
+        [('Alice', 500, 'credit', 'alice 2'), ('Alice', 200, 'debit', 'alice 3')]))
+
+
+def main():
+    server = SyncServer().start()
+    with tempfile.TemporaryDirectory() as tmp:
+        devices = [DBManager(os.path.join(tmp, f"device{i}.db")) for i in (1, 2)]
+        failures = run(devices, [SyncClient(db, server.url) for db in devices])
+        for db in devices:
+            db.conn.close()
+    server.stop()
+
+    if failures:
+        print("Sync identity failures:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("Both devices agree after every step")
+
+
+if __name__ == '__main__':
+    main()
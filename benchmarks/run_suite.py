@@ -0,0 +1,283 @@
+# Reproducible benchmark suite for DBManager, data_io and the expression
+# engine. Results are written as JSON so runs can be compared across commits.
+#
+#   python benchmarks/run_suite.py --sizes 10k,1m --output results.json
+#   python benchmarks/run_suite.py --sizes 10k --compare results.json
+#
+# Each size is a synthetic transactions.db with that many rows in total (one
+# customer per ten ledger entries). Datasets are generated with a fixed seed;
+# pass --data-dir to keep them between runs, since building the 10m dataset
+# takes several minutes.
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calc_engine
+import data_io
+from bench_bulk_import import synthetic_records, write_file
+from db_manager import DBManager
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+# Import throughput is measured on a fresh database of at most this many rows
+IMPORT_ROWS = 100_000
+EXPRESSIONS = [
+    '12*(3+4)/7',
+    '2^10-1',
+    'sqrt(2)*sqrt(8)',
+    'log(1000)+pow(2, 0.5)',
+    '-(1.5+2.25)*4/3',
+    '0.1+0.2',
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed_calls(call, repeat):
+    # Returns latency stats in milliseconds for repeat calls of call(i)
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        call(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'calls': repeat,
+        'p50_ms': round(percentile(samples, 50), 4),
+        'p95_ms': round(percentile(samples, 95), 4),
+        'ops_per_second': round(repeat / (sum(samples) / 1000), 1),
+    }
+
+
+def split_rows(rows):
+    customers = max(1, rows // 10)
+    return customers, rows - customers
+
+
+def build_dataset(path, rows, tmp):
+    customers, transactions = split_rows(rows)
+    source = os.path.join(tmp, f"dataset-{rows}.jsonl")
+    write_file(source, 'jsonl', synthetic_records(customers, transactions))
+    db = DBManager(path, profile='fast')
+    data_io.import_data(db, source, 'jsonl')
+    db.conn.execute("ANALYZE")
+    db.conn.close()
+    os.remove(source)
+
+
+def bench_import(rows, tmp):
+    customers, transactions = split_rows(min(rows, IMPORT_ROWS))
+    source = os.path.join(tmp, 'import.jsonl')
+    write_file(source, 'jsonl', synthetic_records(customers, transactions, seed=1))
+    db = DBManager(os.path.join(tmp, 'import.db'))
+    report = data_io.import_data(db, source, 'jsonl')
+    db.conn.close()
+    os.remove(source)
+    os.remove(os.path.join(tmp, 'import.db'))
+    return {'rows': customers + transactions, 'seconds': round(report.elapsed, 3),
+            'rows_per_second': round(report.rows_per_second, 1)}
+
+
+def bench_reads(db, rows, repeat):
+    customers, _ = split_rows(rows)
+    rng = random.Random(0)
+    customer_ids = [rng.randint(1, customers) for _ in range(repeat)]
+    prefixes = [f"Customer {rng.randint(1, customers)}"[:rng.randint(10, 12)] for _ in range(repeat)]
+    results = {}
+
+    start = time.perf_counter()
+    loaded = len(db.get_customers())
+    elapsed = time.perf_counter() - start
+    results['get_customers'] = {'rows': loaded, 'seconds': round(elapsed, 4),
+                                'rows_per_second': round(loaded / elapsed, 1)}
+
+    results['get_customers_page'] = timed_calls(lambda i: db.get_customers_page(), repeat)
+    results['get_customer_transactions'] = timed_calls(
+        lambda i: db.get_customer_transactions(customer_ids[i]), repeat)
+    results['get_customer_transactions_page'] = timed_calls(
+        lambda i: db.get_customer_transactions_page(customer_ids[i]), repeat)
+    results['search_customers'] = timed_calls(lambda i: db.search_customers(prefixes[i]), repeat)
+    results['get_balance'] = timed_calls(lambda i: db.get_balance(customer_ids[i]), repeat)
+    return results
+
+
+def bench_writes(db, rows, writes):
+    customers, _ = split_rows(rows)
+    results = {}
+    max_ids = {table: db.conn.execute(f"SELECT IFNULL(MAX(id), 0) FROM {table}").fetchone()[0]
+               for table in ('transactions', 'customer_transactions')}
+    max_seq = db.conn.execute("SELECT IFNULL(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+    for label, batched in (('', False), ('_batched', True)):
+        count = writes if batched else max(1, writes // 10)
+        start = time.perf_counter()
+        if batched:
+            with db.batch():
+                for i in range(count):
+                    db.add_transaction(10 + i % 90, 'credit')
+        else:
+            for i in range(count):
+                db.add_transaction(10 + i % 90, 'credit')
+        elapsed = time.perf_counter() - start
+        results[f"add_transaction{label}"] = {'rows': count, 'rows_per_second': round(count / elapsed, 1)}
+
+        start = time.perf_counter()
+        if batched:
+            with db.batch():
+                for i in range(count):
+                    db.add_customer_transaction(1 + i % customers, 10 + i % 90, 'credit', 'bench')
+        else:
+            for i in range(count):
+                db.add_customer_transaction(1 + i % customers, 10 + i % 90, 'credit', 'bench')
+        elapsed = time.perf_counter() - start
+        results[f"add_customer_transaction{label}"] = {'rows': count, 'rows_per_second': round(count / elapsed, 1)}
+
+    # Put the dataset back the way it was so kept datasets stay comparable;
+    # the balance triggers undo the customer_balances changes
+    with db.conn:
+        for table, max_id in max_ids.items():
+            db.conn.execute(f"DELETE FROM {table} WHERE id > ?", (max_id,))
+        db.conn.execute("DELETE FROM change_log WHERE seq > ?", (max_seq,))
+    return results
+
+
+def bench_export(db, tmp):
+    path = os.path.join(tmp, 'export.jsonl')
+    start = time.perf_counter()
+    written = data_io.export_data(db, path, 'jsonl', chunk_size=5000)
+    elapsed = time.perf_counter() - start
+    os.remove(path)
+    return {'rows': written, 'seconds': round(elapsed, 3), 'rows_per_second': round(written / elapsed, 1)}
+
+
+def bench_eval(repeat):
+    results = {}
+    for mode in calc_engine.MODES:
+        calc_engine.compile_expression.cache_clear()
+        start = time.perf_counter()
+        for expression in EXPRESSIONS:
+            calc_engine.evaluate(expression, mode)
+        cold = (time.perf_counter() - start) / len(EXPRESSIONS)
+
+        start = time.perf_counter()
+        for i in range(repeat):
+            calc_engine.evaluate(EXPRESSIONS[i % len(EXPRESSIONS)], mode)
+        elapsed = time.perf_counter() - start
+        results[f"evaluate_{mode}"] = {'cold_us': round(cold * 1e6, 2),
+                                       'evaluations_per_second': round(repeat / elapsed, 1)}
+    try:
+        import numpy
+        import batch_engine
+    except ImportError:
+        return results
+    rng = numpy.random.default_rng(0)
+    left = rng.uniform(-100, 100, repeat)
+    right = rng.uniform(-100, 100, repeat)
+    ops = numpy.array(['+', '-', '*', '/', '^', 'sqrt', 'log'])[rng.integers(0, 7, repeat)]
+    start = time.perf_counter()
+    batch_engine.evaluate_batch(left, ops, right)
+    elapsed = time.perf_counter() - start
+    results['evaluate_batch'] = {'operations': repeat, 'operations_per_second': round(repeat / elapsed, 1)}
+    return results
+
+
+def run_size(name, rows, data_dir, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(data_dir or tmp, f"bench-{name}.db")
+        built = None
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            build_dataset(path, rows, tmp)
+            built = round(time.perf_counter() - start, 2)
+        db = DBManager(path)
+        result = {'rows': rows, 'dataset_build_seconds': built}
+        result.update(bench_reads(db, rows, args.repeat))
+        result['export'] = bench_export(db, tmp)
+        result.update(bench_writes(db, rows, args.writes))
+        db.conn.close()
+        result['import'] = bench_import(rows, tmp)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def flatten(results, prefix=''):
+    # {'1m': {'search_customers': {'p50_ms': 1}}} -> {'1m.search_customers.p50_ms': 1}
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline, current):
+    old = flatten(baseline['results'])
+    new = flatten(current['results'])
+    print(f"{'metric':<58}{'baseline':>14}{'current':>14}{'change':>9}")
+    for key in sorted(old.keys() & new.keys()):
+        # Row and call counts are inputs, not measurements
+        if old[key] and not key.endswith(('.rows', '.calls', '.operations')):
+            print(f"{key:<58}{old[key]:>14,.2f}{new[key]:>14,.2f}{(new[key] - old[key]) / old[key]:>+9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10k', help=f"comma separated, any of {', '.join(SIZES)}")
+    parser.add_argument('--repeat', type=int, default=200, help="calls per read benchmark")
+    parser.add_argument('--writes', type=int, default=2000, help="rows per batched write benchmark")
+    parser.add_argument('--evaluations', type=int, default=100000)
+    parser.add_argument('--data-dir', help="keep generated datasets here and reuse them")
+    parser.add_argument('--output', help="write JSON results to this file instead of stdout")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    sizes = [size.strip().lower() for size in args.sizes.split(',')]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+
+    report = {
+        'commit': git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'results': {'engine': bench_eval(args.evaluations)},
+    }
+    for size in sizes:
+        print(f"running {size}...", file=sys.stderr)
+        report['results'][size] = run_size(size, SIZES[size], args.data_dir, args)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=1)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            compare(json.load(handle), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+# Expression evaluation for the calculator, independent of the UI.
+#
+#   evaluate("12*(3+4)/7")  -> 12.0
+#
+# Supported syntax: numbers, + - * / ^ (also **), unary minus and plus,
+# parentheses and the functions sqrt(x), log(x) (base 10) and pow(x, y).
+# Expressions are tokenized, parsed into an AST and compiled into nested
+# closures; compiled expressions are cached, so evaluating the same text
+# again skips tokenizing and parsing entirely.
+#
+# mode='decimal' evaluates with decimal.Decimal instead of float, so money
+# arithmetic such as 0.1+0.2 is exact (0.3) rather than 0.30000000000000004.
+import decimal
+import math
+import operator
+import re
+from collections import namedtuple
+from decimal import Decimal
+from functools import lru_cache
+
+
+class CalculationError(ValueError):
+    pass
+
+
+Number = namedtuple('Number', 'value')
+UnaryOp = namedtuple('UnaryOp', 'op operand')
+BinaryOp = namedtuple('BinaryOp', 'op left right')
+Call = namedtuple('Call', 'name args')
+
+Token = namedtuple('Token', 'kind text position')
+
+_TOKEN_RE = re.compile(r'''
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<op>\*\*|[-+*/^(),])
+    )''', re.VERBOSE)
+
+# Binding power and associativity of the binary operators
+_BINARY = {
+    '+': (10, 'left'),
+    '-': (10, 'left'),
+    '*': (20, 'left'),
+    '/': (20, 'left'),
+    '^': (40, 'right'),
+}
+# Unary minus binds looser than ^ so that -2^2 == -4
+_UNARY_POWER = 30
+
+MODES = ('float', 'decimal')
+_NUMBER_TYPES = {
+    'float': float,
+    # Through the context, so a literal beyond its range raises Overflow
+    # here rather than later when the result is formatted
+    'decimal': lambda text: decimal.getcontext().create_decimal(text),
+}
+
+_FUNCTIONS = {
+    'sqrt': 1,
+    'log': 1,
+    'pow': 2,
+}
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise CalculationError(f"Unexpected character {text[position:].lstrip()[:1]!r} at position {position}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if value == '**':
+            value = '^'
+        tokens.append(Token(kind, value, match.start(kind)))
+        position = match.end()
+    tokens.append(Token('end', '', position))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def advance(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, text):
+        token = self.advance()
+        if token.text != text:
+            raise CalculationError(f"Expected {text!r} at position {token.position}")
+        return token
+
+    def parse(self):
+        node = self.expression(0)
+        token = self.peek()
+        if token.kind != 'end':
+            raise CalculationError(f"Unexpected {token.text!r} at position {token.position}")
+        return node
+
+    def expression(self, min_power):
+        node = self.prefix()
+        while True:
+            token = self.peek()
+            if token.kind != 'op' or token.text not in _BINARY:
+                return node
+            power, associativity = _BINARY[token.text]
+            if power < min_power:
+                return node
+            self.advance()
+            right = self.expression(power if associativity == 'right' else power + 1)
+            node = BinaryOp(token.text, node, right)
+
+    def prefix(self):
+        token = self.advance()
+        if token.kind == 'number':
+            return Number(token.text)
+        if token.kind == 'op' and token.text in '+-':
+            return UnaryOp(token.text, self.expression(_UNARY_POWER))
+        if token.kind == 'op' and token.text == '(':
+            node = self.expression(0)
+            self.expect(')')
+            return node
+        if token.kind == 'name':
+            if token.text not in _FUNCTIONS:
+                raise CalculationError(f"Unknown function {token.text!r}")
+            self.expect('(')
+            args = [self.expression(0)]
+            while self.peek().text == ',':
+                self.advance()
+                args.append(self.expression(0))
+            self.expect(')')
+            if len(args) != _FUNCTIONS[token.text]:
+                raise CalculationError(f"{token.text}() takes {_FUNCTIONS[token.text]} argument(s)")
+            return Call(token.text, tuple(args))
+        if token.kind == 'end':
+            raise CalculationError("Incomplete expression")
+        raise CalculationError(f"Unexpected {token.text!r} at position {token.position}")
+
+
+def parse(text):
+    return _Parser(tokenize(text)).parse()
+
+
+def _divide(left, right):
+    if right == 0:
+        raise CalculationError("Division by zero")
+    return left / right
+
+
+def _power(left, right):
+    # Decimal returns Infinity for 0^-n and rejects 0^0; match float instead
+    if left == 0 and right < 0:
+        raise CalculationError("Division by zero")
+    if left == 0 and right == 0:
+        return left + 1
+    try:
+        result = left ** right
+    except ZeroDivisionError:
+        raise CalculationError("Division by zero")
+    except (OverflowError, decimal.Overflow):
+        raise CalculationError("Result too large")
+    except decimal.InvalidOperation:
+        raise CalculationError("Result is not a real number")
+    if isinstance(result, complex):
+        raise CalculationError("Result is not a real number")
+    return result
+
+
+def _sqrt(value):
+    if value < 0:
+        raise CalculationError("Square root of a negative number")
+    return value.sqrt() if isinstance(value, Decimal) else math.sqrt(value)
+
+
+def _log(value):
+    if value <= 0:
+        raise CalculationError("Logarithm of a non-positive number")
+    return value.log10() if isinstance(value, Decimal) else math.log10(value)
+
+
+_BINARY_FUNCTIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': _divide,
+    '^': _power,
+}
+_CALL_FUNCTIONS = {
+    'sqrt': _sqrt,
+    'log': _log,
+    'pow': _power,
+}
+
+
+def compile_ast(node, mode='float'):
+    # Turn the AST into a tree of closures so evaluation is a few direct
+    # calls with no dispatch on node types
+    if isinstance(node, Number):
+        value = _NUMBER_TYPES[mode](node.value)
+        return lambda: value
+    if isinstance(node, UnaryOp):
+        operand = compile_ast(node.operand, mode)
+        if node.op == '-':
+            return lambda: -operand()
+        return operand
+    if isinstance(node, BinaryOp):
+        function = _BINARY_FUNCTIONS[node.op]
+        left = compile_ast(node.left, mode)
+        right = compile_ast(node.right, mode)
+        return lambda: function(left(), right())
+    if isinstance(node, Call):
+        function = _CALL_FUNCTIONS[node.name]
+        args = [compile_ast(arg, mode) for arg in node.args]
+        if len(args) == 1:
+            (arg,) = args
+            return lambda: function(arg())
+        return lambda: function(*(arg() for arg in args))
+    raise TypeError(f"Not an expression node: {node!r}")
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(text, mode='float'):
+    if mode not in MODES:
+        raise ValueError(f"Unknown arithmetic mode: {mode}")
+    return compile_ast(parse(text), mode)
+
+
+def _checked(compute):
+    try:
+        result = compute()
+    except (OverflowError, decimal.Overflow):
+        raise CalculationError("Result too large")
+    except decimal.InvalidOperation:
+        raise CalculationError("Invalid operation")
+    except RecursionError:
+        raise CalculationError("Expression is nested too deeply")
+    # Float arithmetic overflows to inf (and inf - inf to nan) without raising
+    if isinstance(result, float) and not math.isfinite(result):
+        raise CalculationError("Result too large" if math.isinf(result) else "Invalid operation")
+    return result
+
+
+def evaluate(text, mode='float'):
+    return _checked(lambda: compile_expression(text.strip(), mode)())
+
+
+def call(name, *args):
+    # Applies sqrt, log or pow to values evaluate() already returned, with
+    # the same errors as writing the call in an expression
+    function = _CALL_FUNCTIONS.get(name)
+    if function is None:
+        raise CalculationError(f"Unknown function {name!r}")
+    return _checked(lambda: function(*args))
+
+
+def operation_type(text):
+    # History category of an expression: the function at its root (a^b
+    # counts as pow), otherwise 'arithmetic'
+    try:
+        node = parse(text.strip())
+    except (CalculationError, RecursionError):
+        return 'arithmetic'
+    if isinstance(node, Call):
+        return node.name
+    if isinstance(node, BinaryOp) and node.op == '^':
+        return 'pow'
+    return 'arithmetic'
+
+
+def format_number(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e16:
+        return str(int(value))
+    if isinstance(value, Decimal):
+        if value == value.to_integral_value() and abs(value) < Decimal('1e16'):
+            return str(int(value))
+        return str(value.normalize())
+    return str(value)
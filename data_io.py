@@ -0,0 +1,331 @@
+# Streaming export and bulk import of customers and their ledgers.
+#
+# Every format is a single stream: all customer records first, then all
+# customer_transactions records, each tagged with a "record" field of
+# "customer" or "transaction".
+#
+#   csv       one row per record; columns are the union of both record types
+#   jsonl     one JSON object per record
+#   columnar  one JSON object per chunk holding a list of values per column,
+#             which keeps the field names out of every row
+import csv
+import json
+import os
+import time
+from collections import Counter
+
+from db_manager import CUSTOMER_FIELDS, CUSTOMER_TRANSACTION_FIELDS, to_cents
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'columnar')
+RECORD_FIELDS = {
+    'customer': CUSTOMER_FIELDS,
+    'transaction': CUSTOMER_TRANSACTION_FIELDS,
+}
+CSV_FIELDS = ('record',) + tuple(dict.fromkeys(CUSTOMER_FIELDS + CUSTOMER_TRANSACTION_FIELDS))
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension == '.jsonl':
+        return 'jsonl'
+    raise ValueError(f"Cannot tell the export format from {path!r}; pass one of {EXPORT_FORMATS}")
+
+
+def _record_chunks(db, chunk_size):
+    yield from (('customer', rows) for rows in db.iter_customers(chunk_size))
+    yield from (('transaction', rows) for rows in db.iter_customer_transactions(chunk_size))
+
+
+def _write_csv(handle, chunks, progress):
+    writer = csv.writer(handle)
+    writer.writerow(CSV_FIELDS)
+    positions = {record: [CSV_FIELDS.index(field) for field in fields]
+                 for record, fields in RECORD_FIELDS.items()}
+    for record, rows in chunks:
+        for row in rows:
+            line = [''] * len(CSV_FIELDS)
+            line[0] = record
+            for position, value in zip(positions[record], row):
+                line[position] = '' if value is None else value
+            writer.writerow(line)
+        progress(len(rows))
+
+
+def _write_jsonl(handle, chunks, progress):
+    for record, rows in chunks:
+        fields = RECORD_FIELDS[record]
+        handle.writelines(json.dumps({'record': record, **dict(zip(fields, row))}) + '\n' for row in rows)
+        progress(len(rows))
+
+
+def _write_columnar(handle, chunks, progress):
+    for record, rows in chunks:
+        columns = dict(zip(RECORD_FIELDS[record], (list(column) for column in zip(*rows))))
+        handle.write(json.dumps({'record': record, 'rows': len(rows), 'columns': columns}) + '\n')
+        progress(len(rows))
+
+
+WRITERS = {
+    'csv': _write_csv,
+    'jsonl': _write_jsonl,
+    'columnar': _write_columnar,
+}
+
+
+def export_data(db, path, fmt=None, chunk_size=1000, progress=None):
+    # progress, if given, is called as progress(rows_written, total_rows)
+    # after every chunk. Returns the number of records written.
+    fmt = fmt or guess_format(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    total = db.count_rows('customers') + db.count_rows('customer_transactions')
+    written = 0
+
+    def advance(rows):
+        nonlocal written
+        written += rows
+        if progress is not None:
+            progress(written, total)
+
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        WRITERS[fmt](handle, _record_chunks(db, chunk_size), advance)
+    return written
+
+
+def _read_csv(handle):
+    for row in csv.DictReader(handle):
+        yield row.pop('record', None), {key: (value if value != '' else None) for key, value in row.items()}
+
+
+def _read_jsonl(handle):
+    for line in handle:
+        if line.strip():
+            row = json.loads(line)
+            yield row.pop('record', None), row
+
+
+def _read_columnar(handle):
+    for line in handle:
+        if line.strip():
+            chunk = json.loads(line)
+            columns = chunk['columns']
+            for values in zip(*columns.values()):
+                yield chunk['record'], dict(zip(columns, values))
+
+
+READERS = {
+    'csv': _read_csv,
+    'jsonl': _read_jsonl,
+    'columnar': _read_columnar,
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.customers_inserted = 0
+        self.customers_matched = 0
+        self.transactions_inserted = 0
+        self.transactions_skipped = 0
+        self.rejected = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def rows(self):
+        return (self.customers_inserted + self.customers_matched + self.transactions_inserted
+                + self.transactions_skipped + self.rejected)
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def reject(self, line, message):
+        self.rejected += 1
+        # Keep the report small when a whole file is malformed
+        if len(self.errors) < 100:
+            self.errors.append(f"record {line}: {message}")
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+class _Importer:
+    def __init__(self, db, report):
+        self.cursor = db.conn.cursor()
+        self.report = report
+        # Export id -> local id for customers seen so far in this file
+        self.customer_ids = {}
+        # Phone/email -> local id, covering both existing customers and the
+        # ones inserted by this import so duplicates within the file collapse
+        self.phones = {}
+        self.emails = {}
+        self.cursor.execute("SELECT seq FROM sqlite_sequence WHERE name='customers'")
+        row = self.cursor.fetchone()
+        self.cursor.execute('SELECT MAX(id) FROM customers')
+        self.next_customer_id = max(row[0] if row else 0, self.cursor.fetchone()[0] or 0) + 1
+        # Customers below this id existed before the import; their ledger
+        # entries are loaded on first use so re-imported ones can be skipped
+        self.first_new_customer_id = self.next_customer_id
+        self.existing_ledgers = {}
+
+    def _existing_contacts(self, column, values):
+        values = list(values)
+        found = {}
+        for start in range(0, len(values), 500):
+            chunk = values[start:start + 500]
+            self.cursor.execute(
+                f"SELECT {column}, MIN(id) FROM customers WHERE {column} IN ({','.join('?' * len(chunk))}) "
+                f"GROUP BY {column}", chunk)
+            found.update(self.cursor.fetchall())
+        return found
+
+    def add_customers(self, records):
+        for column, known in (('phone', self.phones), ('email', self.emails)):
+            unseen = {record[column] for _, record in records if record[column] and record[column] not in known}
+            known.update(self._existing_contacts(column, unseen))
+
+        new_rows = []
+        for source_id, record in records:
+            local_id = self.phones.get(record['phone']) or self.emails.get(record['email'])
+            if local_id is not None:
+                self.report.customers_matched += 1
+            else:
+                local_id = self.next_customer_id
+                self.next_customer_id += 1
+                new_rows.append((local_id, record['name'], record['phone'], record['email'],
+                                 record['address'], record['created_at']))
+                self.report.customers_inserted += 1
+                if record['phone']:
+                    self.phones[record['phone']] = local_id
+                if record['email']:
+                    self.emails[record['email']] = local_id
+            if source_id is not None:
+                self.customer_ids[source_id] = local_id
+
+        self.cursor.executemany('''
+            INSERT INTO customers (id, name, phone, email, address, created_at)
+            VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        ''', new_rows)
+
+    def _load_ledgers(self, customer_ids):
+        customer_ids = list(customer_ids)
+        for customer_id in customer_ids:
+            self.existing_ledgers[customer_id] = Counter()
+        for start in range(0, len(customer_ids), 500):
+            chunk = customer_ids[start:start + 500]
+            self.cursor.execute(
+                f"SELECT customer_id, amount_cents, type, description, timestamp FROM customer_transactions "
+                f"WHERE customer_id IN ({','.join('?' * len(chunk))})", chunk)
+            # Cleaned like validate_transaction cleans the incoming fields, so
+            # '' and ' coffee ' match what a re-import of them looks like
+            for customer_id, amount_cents, transaction_type, description, timestamp in self.cursor:
+                key = (amount_cents, transaction_type, _clean(description), _clean(timestamp))
+                self.existing_ledgers[customer_id][key] += 1
+
+    def add_transactions(self, rows):
+        existing = {row[0] for row in rows if row[0] < self.first_new_customer_id}
+        new_rows = rows
+        if existing:
+            self._load_ledgers(existing.difference(self.existing_ledgers))
+            new_rows = []
+            for row in rows:
+                # A counter rather than a set, so an entry the file repeats
+                # is only skipped as often as the ledger already has it
+                ledger = self.existing_ledgers.get(row[0])
+                key = row[2:]
+                if ledger and ledger[key] > 0:
+                    ledger[key] -= 1
+                    self.report.transactions_skipped += 1
+                else:
+                    new_rows.append(row)
+        self.cursor.executemany('''
+            INSERT INTO customer_transactions (customer_id, amount, amount_cents, type, description, timestamp)
+            VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        ''', new_rows)
+        self.report.transactions_inserted += len(new_rows)
+
+    def validate_customer(self, line, record):
+        name = _clean(record.get('name'))
+        if name is None:
+            self.report.reject(line, "customer without a name")
+            return None
+        source_id = _clean(record.get('id'))
+        return source_id, {
+            'name': name,
+            'phone': _clean(record.get('phone')),
+            'email': _clean(record.get('email')),
+            'address': _clean(record.get('address')),
+            'created_at': _clean(record.get('created_at')),
+        }
+
+    def validate_transaction(self, line, record):
+        customer_id = self.customer_ids.get(_clean(record.get('customer_id')))
+        if customer_id is None:
+            self.report.reject(line, f"unknown customer {record.get('customer_id')!r}")
+            return None
+        try:
+            cents = to_cents(record.get('amount'))
+        except ValueError:
+            self.report.reject(line, f"invalid amount {record.get('amount')!r}")
+            return None
+        transaction_type = _clean(record.get('type'))
+        if transaction_type not in ('credit', 'debit'):
+            self.report.reject(line, f"invalid type {record.get('type')!r}")
+            return None
+        return (customer_id, cents / 100, cents, transaction_type, _clean(record.get('description')),
+                _clean(record.get('timestamp')))
+
+
+def import_data(db, path, fmt=None, chunk_size=5000, progress=None):
+    # Imports customers and ledger entries written by export_data. Customers
+    # whose phone or email already exists are matched to the existing row
+    # instead of duplicated, and their ledger entries attach to it; entries
+    # that ledger already has (same amount, type, description and timestamp)
+    # are skipped. The whole file is applied in one transaction. progress, if
+    # given, is called as progress(records_read) after every chunk.
+    fmt = fmt or guess_format(path)
+    if fmt not in READERS:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+    report = ImportReport()
+    start = time.perf_counter()
+    customers, transactions = [], []
+    with open(path, newline='', encoding='utf-8') as handle, db.batch():
+        importer = _Importer(db, report)
+
+        def flush():
+            if customers:
+                importer.add_customers(customers)
+                customers.clear()
+            if transactions:
+                importer.add_transactions(transactions)
+                transactions.clear()
+            if progress is not None:
+                progress(report.rows)
+
+        for line, (record, row) in enumerate(READERS[fmt](handle), start=1):
+            if record == 'customer':
+                customer = importer.validate_customer(line, row)
+                if customer is not None:
+                    customers.append(customer)
+            elif record == 'transaction':
+                # Ledger entries may only refer to customers already flushed
+                if customers:
+                    flush()
+                transaction = importer.validate_transaction(line, row)
+                if transaction is not None:
+                    transactions.append(transaction)
+            else:
+                report.reject(line, f"unknown record type {record!r}")
+            if len(customers) + len(transactions) >= chunk_size:
+                flush()
+        flush()
+    report.elapsed = time.perf_counter() - start
+    return report
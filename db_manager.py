@@ -1,69 +1,179 @@
+import os
 import sqlite3
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, DecimalException
+
+import migrations
+
+# PRAGMAs applied to every new connection. 'safe' keeps SQLite's rollback
+# journal; the WAL profiles let readers run while a write is in progress.
+CONNECTION_PROFILES = {
+    'safe': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'temp_store': 'DEFAULT',
+    },
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+DEFAULT_PROFILE = 'balanced'
+DEFAULT_DB_PATH = 'transactions.db'
+
+CUSTOMER_FIELDS = ('id', 'name', 'phone', 'email', 'address', 'created_at')
+CUSTOMER_TRANSACTION_FIELDS = ('id', 'customer_id', 'amount', 'type', 'description', 'timestamp')
+
+# Columns customer transaction history can be sorted by. NULLs are folded
+# into '' so the keyset comparison in _history_page never meets a NULL.
+HISTORY_SORT_COLUMNS = {
+    'id': 'id',
+    'amount': 'amount',
+    'type': "IFNULL(type, '')",
+    'description': "IFNULL(description, '')",
+    'timestamp': 'timestamp',
+}
+
+def _fts_query(text):
+    # Builds an FTS5 query from what the user typed: every word must match,
+    # as a prefix, with FTS syntax characters taken literally
+    words = [word for word in (text or '').split() if any(char.isalnum() for char in word)]
+    return ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+
+# Amounts are stored as SQLite integers, which are signed 64-bit
+MAX_CENTS = 2 ** 63 - 1
+
+def to_cents(amount):
+    # Integer minor units, rounded half-up. Floats go through str() so they
+    # convert from their shortest repr rather than their exact binary value.
+    try:
+        value = amount if isinstance(amount, Decimal) else Decimal(str(amount).strip())
+        cents = int(value.scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (DecimalException, ValueError, OverflowError):
+        raise ValueError(f"Invalid amount: {amount!r}")
+    if abs(cents) > MAX_CENTS:
+        raise ValueError(f"Invalid amount: {amount!r}")
+    return cents
+
+def from_cents(cents):
+    return Decimal(cents).scaleb(-2)
+
+class _WriteBatch:
+    def __init__(self, max_rows, max_delay):
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.pending = 0
+        self.started = time.monotonic()
+
+    def is_due(self):
+        if self.max_rows is not None and self.pending >= self.max_rows:
+            return True
+        return self.max_delay is not None and time.monotonic() - self.started >= self.max_delay
 
 class DBManager:
-    def __init__(self):
-        self.conn = sqlite3.connect('transactions.db')
+    def __init__(self, db_path=DEFAULT_DB_PATH, profile=DEFAULT_PROFILE):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self._batch = None
+        self.apply_profile(profile)
         self.create_tables()
+        if os.environ.get('SMART_CALC_DB_TRACE'):
+            import profiling
+            profiling.instrument_db(self)
 
-    def create_tables(self):
+    def apply_profile(self, profile):
+        if profile not in CONNECTION_PROFILES:
+            raise ValueError(f"Unknown connection profile: {profile}")
         cursor = self.conn.cursor()
-        
-        # Create transactions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                amount REAL NOT NULL,
-                description TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create customers table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT,
-                email TEXT,
-                address TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create customer transactions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customer_transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER,
-                amount REAL NOT NULL,
-                type TEXT CHECK(type IN ('credit', 'debit')),
-                description TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers (id)
-            )
-        ''')
-        
-        self.conn.commit()
+        self.pending_journal_mode = None
+        for pragma, value in CONNECTION_PROFILES[profile].items():
+            if pragma == 'journal_mode':
+                self._set_journal_mode(cursor, value)
+            else:
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+        self.profile = profile
+        # False when the journal mode could not be switched yet
+        return self.pending_journal_mode is None
+
+    def _set_journal_mode(self, cursor, mode):
+        # Leaving or entering WAL needs the database to itself. If another
+        # connection is open, give up at once rather than waiting out the busy
+        # timeout; the mode is then applied by the next DBManager to open the
+        # file, i.e. on restart.
+        busy_timeout = cursor.execute('PRAGMA busy_timeout').fetchone()[0]
+        cursor.execute('PRAGMA busy_timeout = 0')
+        try:
+            cursor.execute(f'PRAGMA journal_mode = {mode}')
+        except sqlite3.OperationalError:
+            self.pending_journal_mode = mode
+        finally:
+            cursor.execute(f'PRAGMA busy_timeout = {busy_timeout}')
+
+    @contextmanager
+    def batch(self, max_rows=None, max_delay=None):
+        # Group the writes made inside the block into as few transactions as
+        # possible. With max_rows/max_delay set, the open transaction is also
+        # committed once that many writes or seconds have accumulated; an
+        # exception only rolls back the group that has not been committed yet.
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = _WriteBatch(max_rows, max_delay)
+        try:
+            yield self
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            self._batch = None
+
+    def _commit(self):
+        if self._batch is None:
+            self.conn.commit()
+            return
+        self._batch.pending += 1
+        if self._batch.is_due():
+            self.conn.commit()
+            self._batch.pending = 0
+            self._batch.started = time.monotonic()
+
+    def create_tables(self):
+        migrations.migrate(self.conn)
 
     def add_transaction(self, amount, description):
+        cents = to_cents(amount)
         cursor = self.conn.cursor()
-        cursor.execute('INSERT INTO transactions (amount, description) VALUES (?, ?)',
-                      (amount, description))
-        self.conn.commit()
+        cursor.execute('INSERT INTO transactions (amount, amount_cents, description) VALUES (?, ?, ?)',
+                      (cents / 100, cents, description))
+        self._commit()
 
-    def get_transactions(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM transactions ORDER BY timestamp DESC LIMIT 100')
-        return cursor.fetchall()
+    def get_transactions(self, limit=100):
+        return self.get_transactions_page(page_size=limit)[0]
+
+    def get_transactions_page(self, page_size=100, after_timestamp=None, after_id=None, cursor=None):
+        return self._history_page('transactions', '', (), page_size, after_timestamp, after_id, cursor)
 
     def add_customer(self, name, phone, email, address):
         cursor = self.conn.cursor()
         cursor.execute('''
-            INSERT INTO customers (name, phone, email, address)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO customers (name, phone, email, address, updated_at)
+            VALUES (?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
         ''', (name, phone, email, address))
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def get_customers(self):
@@ -71,60 +181,331 @@ class DBManager:
         cursor.execute('SELECT * FROM customers ORDER BY name')
         return cursor.fetchall()
 
+    def search_customers(self, prefix, limit=50):
+        # Range scan on the NOCASE index instead of LIKE, so '%' and '_'
+        # in the search text are matched literally and the index is still used
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT * FROM customers
+            WHERE name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE
+            ORDER BY name COLLATE NOCASE
+            LIMIT ?
+        ''', (prefix, prefix + '\U0010ffff', limit))
+        return cursor.fetchall()
+
+    def get_customers_page(self, page_size=100, after_name=None, after_id=None, cursor=None):
+        # Keyset pagination in the same case-insensitive order as the search
+        # index, so each page is a range scan on idx_customers_name_nocase
+        if cursor is not None:
+            after_name, after_id = cursor
+        db_cursor = self.conn.cursor()
+        if after_id is None:
+            db_cursor.execute('''
+                SELECT * FROM customers
+                ORDER BY name COLLATE NOCASE, id
+                LIMIT ?
+            ''', (page_size,))
+        else:
+            db_cursor.execute('''
+                SELECT * FROM customers
+                WHERE name >= ? COLLATE NOCASE AND (name > ? COLLATE NOCASE OR id > ?)
+                ORDER BY name COLLATE NOCASE, id
+                LIMIT ?
+            ''', (after_name, after_name, after_id, page_size))
+        rows = db_cursor.fetchall()
+        if len(rows) < page_size:
+            return rows, None
+        return rows, (rows[-1][1], rows[-1][0])
+
     def update_customer(self, customer_id, name, phone, email, address):
         cursor = self.conn.cursor()
         cursor.execute('''
             UPDATE customers 
-            SET name=?, phone=?, email=?, address=?
+            SET name=?, phone=?, email=?, address=?, updated_at=strftime('%Y-%m-%d %H:%M:%f', 'now')
             WHERE id=?
         ''', (name, phone, email, address, customer_id))
-        self.conn.commit()
+        self._commit()
 
     def delete_customer(self, customer_id):
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM customers WHERE id=?', (customer_id,))
-        self.conn.commit()
+        self._commit()
 
     def add_customer_transaction(self, customer_id, amount, type, description):
+        cents = to_cents(amount)
         cursor = self.conn.cursor()
         cursor.execute('''
-            INSERT INTO customer_transactions (customer_id, amount, type, description)
-            VALUES (?, ?, ?, ?)
-        ''', (customer_id, amount, type, description))
-        self.conn.commit()
+            INSERT INTO customer_transactions (customer_id, amount, amount_cents, type, description)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (customer_id, cents / 100, cents, type, description))
+        self._commit()
 
     def get_customer_transactions(self, customer_id):
         cursor = self.conn.cursor()
         cursor.execute('''
             SELECT * FROM customer_transactions 
             WHERE customer_id=? 
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, id DESC
         ''', (customer_id,))
         return cursor.fetchall()
 
-    def get_customer(self, customer_id):
+    def get_customer_transactions_page(self, customer_id, page_size=100, after_timestamp=None,
+                                       after_id=None, cursor=None, sort_column='timestamp',
+                                       descending=True):
+        # With a sort_column other than timestamp, after_timestamp holds the
+        # value of that column; normally callers just pass back the cursor
+        return self._history_page('customer_transactions', 'customer_id=?', (customer_id,),
+                                  page_size, after_timestamp, after_id, cursor,
+                                  HISTORY_SORT_COLUMNS[sort_column], descending)
+
+    def _history_page(self, table, where, params, page_size, after_value, after_id, cursor,
+                      sort_expr='timestamp', descending=True):
+        # Keyset pagination: each page resumes strictly after the (sort key,
+        # id) of the previous page's last row, so the cost of a page does not
+        # grow with how far into the history it is. Returns the rows and the
+        # cursor for the next page, or None on the last page.
+        if cursor is not None:
+            after_value, after_id = cursor
+        direction = 'DESC' if descending else 'ASC'
+        conditions = [where] if where else []
+        params = list(params)
+        if after_id is not None:
+            conditions.append(f"({sort_expr}, id) {'<' if descending else '>'} (?, ?)")
+            params += [after_value, after_id]
+        sql = f'SELECT *, {sort_expr} FROM {table}'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += f' ORDER BY {sort_expr} {direction}, id {direction} LIMIT ?'
+        db_cursor = self.conn.cursor()
+        db_cursor.execute(sql, params + [page_size])
+        rows = db_cursor.fetchall()
+        next_cursor = (rows[-1][-1], rows[-1][0]) if len(rows) == page_size else None
+        return [row[:-1] for row in rows], next_cursor
+
+    def add_history(self, entry, operation='arithmetic'):
+        if operation not in migrations.HISTORY_OPERATIONS:
+            raise ValueError(f"Unknown operation type: {operation}")
         cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM customers WHERE id=?', (customer_id,))
-        return cursor.fetchone()
+        cursor.execute('INSERT INTO calculation_history (entry, operation) VALUES (?, ?)', (entry, operation))
+        self._commit()
+        return cursor.lastrowid
+
+    def import_history(self, entries):
+        # entries oldest first, e.g. the list the calculator used to keep in
+        # QSettings; the retention trigger still applies. sqrt/pow/log
+        # button entries read "op(x) = y".
+        def operation(entry):
+            return next((op for op in migrations.HISTORY_OPERATIONS[1:] if entry.startswith(op + '(')), 'arithmetic')
+        cursor = self.conn.cursor()
+        cursor.executemany('INSERT INTO calculation_history (entry, operation) VALUES (?, ?)',
+                           ((entry, operation(entry)) for entry in entries))
+        self._commit()
+
+    def get_history(self, limit=100):
+        return self.search_history(page_size=limit)[0]
+
+    def search_history(self, text=None, operation=None, start_timestamp=None, end_timestamp=None,
+                       page_size=100, cursor=None):
+        # Newest first. Each word of text must match the full-text index as
+        # a prefix ("12" finds 12.5 and 120); timestamp bounds are inclusive.
+        # History is append-only, so ids grow with time and the cursor is
+        # just the last id returned (None on the last page).
+        id_range = self._history_id_range(start_timestamp, end_timestamp)
+        if id_range is None:
+            return [], None
+        low_id, high_id = id_range
+        if cursor is not None:
+            high_id = cursor - 1 if high_id is None else min(high_id, cursor - 1)
+        query = _fts_query(text)
+        # With a text query the FTS index drives the scan in rowid order, so
+        # a page stops as soon as it is full however many rows match
+        key = 'f.rowid' if query else 'h.id'
+        conditions = []
+        params = []
+        if query:
+            conditions.append('calculation_history_fts MATCH ?')
+            params.append(query)
+        if low_id is not None:
+            conditions.append(f'{key} >= ?')
+            params.append(low_id)
+        if high_id is not None:
+            conditions.append(f'{key} <= ?')
+            params.append(high_id)
+        if operation:
+            conditions.append('h.operation = ?')
+            params.append(operation)
+        sql = 'SELECT h.id, h.entry, h.timestamp, h.operation FROM '
+        if query:
+            sql += 'calculation_history_fts f CROSS JOIN calculation_history h ON h.id = f.rowid'
+        else:
+            sql += 'calculation_history h'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += f' ORDER BY {key} DESC LIMIT ?'
+        db_cursor = self.conn.cursor()
+        db_cursor.execute(sql, params + [page_size])
+        rows = db_cursor.fetchall()
+        return rows, (rows[-1][0] if len(rows) == page_size else None)
+
+    def _history_id_range(self, start_timestamp, end_timestamp):
+        # Turns a timestamp range into an id range through the timestamp
+        # index; None when no calculation falls inside it
+        low_id = high_id = None
+        cursor = self.conn.cursor()
+        if start_timestamp is not None:
+            cursor.execute('''
+                SELECT id FROM calculation_history WHERE timestamp >= ?
+                ORDER BY timestamp, id LIMIT 1
+            ''', (start_timestamp,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            low_id = row[0]
+        if end_timestamp is not None:
+            cursor.execute('''
+                SELECT id FROM calculation_history WHERE timestamp <= ?
+                ORDER BY timestamp DESC, id DESC LIMIT 1
+            ''', (end_timestamp,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            high_id = row[0]
+        return low_id, high_id
+
+    def clear_history(self):
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM calculation_history')
+        self._commit()
+
+    def get_balance(self, customer_id):
+        return from_cents(self.get_balance_cents(customer_id))
+
+    def get_balance_cents(self, customer_id):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT balance_cents FROM customer_balances WHERE customer_id=?', (customer_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def get_balances(self, customer_ids):
+        customer_ids = list(customer_ids)
+        balances = dict.fromkeys(customer_ids, 0)
+        cursor = self.conn.cursor()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(customer_ids), 500):
+            chunk = customer_ids[start:start + 500]
+            cursor.execute(f'''
+                SELECT customer_id, balance_cents FROM customer_balances
+                WHERE customer_id IN ({','.join('?' * len(chunk))})
+            ''', chunk)
+            balances.update(cursor.fetchall())
+        return {customer_id: from_cents(cents) for customer_id, cents in balances.items()}
+
+    def sum_transactions_cents(self, start_timestamp=None, end_timestamp=None):
+        # Exact integer sum computed by SQLite; the bounds are inclusive and
+        # use the timestamp index
+        conditions, params = [], []
+        if start_timestamp is not None:
+            conditions.append('timestamp >= ?')
+            params.append(start_timestamp)
+        if end_timestamp is not None:
+            conditions.append('timestamp <= ?')
+            params.append(end_timestamp)
+        sql = 'SELECT COALESCE(SUM(amount_cents), 0) FROM transactions'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+    def sum_customer_transactions_cents(self, customer_id, type=None):
+        sql = 'SELECT COALESCE(SUM(amount_cents), 0) FROM customer_transactions WHERE customer_id=?'
+        params = [customer_id]
+        if type is not None:
+            sql += ' AND type=?'
+            params.append(type)
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
 
-    def export_customer_data(self):
+    def verify_balances(self):
+        # Returns (customer_id, stored_cents, ledger_cents) for every customer
+        # whose materialized balance disagrees with the raw ledger
         cursor = self.conn.cursor()
         cursor.execute('''
-            SELECT c.*, GROUP_CONCAT(ct.amount || ',' || ct.type || ',' || ct.timestamp)
-            FROM customers c
-            LEFT JOIN customer_transactions ct ON c.id = ct.customer_id
-            GROUP BY c.id
+            WITH ledger AS (
+                SELECT customer_id,
+                       SUM(CASE type WHEN 'debit' THEN -amount_cents ELSE amount_cents END) AS balance_cents,
+                       COUNT(*) AS transaction_count
+                FROM customer_transactions
+                WHERE customer_id IS NOT NULL
+                GROUP BY customer_id
+            )
+            SELECT l.customer_id, COALESCE(b.balance_cents, 0), l.balance_cents
+            FROM ledger l
+            LEFT JOIN customer_balances b ON b.customer_id = l.customer_id
+            WHERE b.customer_id IS NULL
+               OR b.balance_cents != l.balance_cents
+               OR b.transaction_count != l.transaction_count
+            UNION ALL
+            SELECT b.customer_id, b.balance_cents, 0
+            FROM customer_balances b
+            WHERE (b.transaction_count != 0 OR b.balance_cents != 0)
+              AND NOT EXISTS (SELECT 1 FROM customer_transactions ct WHERE ct.customer_id = b.customer_id)
         ''')
         return cursor.fetchall()
 
-    def import_customer_data(self, customer_data):
+    def rebuild_balances(self):
         cursor = self.conn.cursor()
-        for customer in customer_data:
-            cursor.execute('''
-                INSERT INTO customers (name, phone, email, address)
-                VALUES (?, ?, ?, ?)
-            ''', customer[:4])
-        self.conn.commit()
+        cursor.execute('DELETE FROM customer_balances')
+        cursor.execute('''
+            INSERT INTO customer_balances (customer_id, balance, balance_cents, transaction_count)
+            SELECT customer_id, total / 100.0, total, transaction_count
+            FROM (
+                SELECT customer_id,
+                       SUM(CASE type WHEN 'debit' THEN -amount_cents ELSE amount_cents END) AS total,
+                       COUNT(*) AS transaction_count
+                FROM customer_transactions
+                WHERE customer_id IS NOT NULL
+                GROUP BY customer_id
+            )
+        ''')
+        self._commit()
+        return cursor.rowcount
+
+    def get_customer(self, customer_id):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM customers WHERE id=?', (customer_id,))
+        return cursor.fetchone()
+
+    def count_rows(self, table):
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        return cursor.fetchone()[0]
+
+    def iter_customers(self, chunk_size=1000):
+        yield from self._iter_chunks(f"SELECT {', '.join(CUSTOMER_FIELDS)} FROM customers ORDER BY id",
+                                     chunk_size)
+
+    def iter_customer_transactions(self, chunk_size=1000):
+        yield from self._iter_chunks(
+            f"SELECT {', '.join(CUSTOMER_TRANSACTION_FIELDS)} FROM customer_transactions ORDER BY id",
+            chunk_size)
+
+    def _iter_chunks(self, sql, chunk_size):
+        # Rowid order needs no sort, and fetchmany keeps at most one chunk
+        # of rows in memory
+        cursor = self.conn.cursor()
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+    def explain_query_plan(self, sql, params=()):
+        cursor = self.conn.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[3] for row in cursor.fetchall()]
 
     def __del__(self):
         self.conn.close()
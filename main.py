@@ -1,34 +1,90 @@
+import time
+STARTED_AT = time.perf_counter()
+
+import os
 import sys
-import math
-import json
-from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QListWidget, QMenu, 
                            QAction, QDialog, QVBoxLayout, QHBoxLayout, 
-                           QLabel, QLineEdit, QPushButton, QTableWidget,
-                           QTableWidgetItem, QMessageBox, QFileDialog)
-from PyQt5.QtCore import Qt, QSettings
+                           QLabel, QLineEdit, QPushButton, QTableView,
+                           QHeaderView, QMessageBox, QFileDialog, QProgressDialog,
+                           QListView, QComboBox, QCheckBox, QDateEdit)
+from PyQt5.QtCore import Qt, QDate, QDateTime, QEvent, QObject, QSettings, QTime, QTimer
 from PyQt5.QtGui import QKeySequence
 from ui_main import Ui_MainWindow
-from db_manager import DBManager
+import calc_engine
+import profiling
+from db_manager import CONNECTION_PROFILES, DEFAULT_DB_PATH, DEFAULT_PROFILE, DBManager
+from workers import CustomerSearcher, SyncWorker
 
 class CalculatorApp(QMainWindow, Ui_MainWindow):
     def __init__(self):
         super().__init__()
-        self.setupUi(self)
-        self.db = DBManager()
+        with profiling.get_tracer().phase('setupUi'):
+            self.setupUi(self)
         self.settings = QSettings('Smart-Calculator', 'Calculator')
-        self.history = []
+        self.db_profile = self.loadDatabaseProfile()
+        self._db = None
+        self.menu = None
+        self.sync_worker = None
         self.undo_stack = []
         self.redo_stack = []
         self.initUI()
-        self.current_input = ""
-        self.operation = None
-        self.first_operand = None
-        self.setupHamburgerMenu()
         self.setupKeyboardShortcuts()
         self.loadTheme()
+        self.loadArithmeticMode()
+        # Everything the keypad does not need waits until after the first paint
+        QTimer.singleShot(0, self.loadDeferred)
+
+    @property
+    def db(self):
+        # Opening (and migrating) the database is deferred to first use
+        if self._db is None:
+            with profiling.get_tracer().phase('DBManager()'):
+                self._db = DBManager(DEFAULT_DB_PATH, self.db_profile)
+        return self._db
+
+    @profiling.traced()
+    def loadDeferred(self):
         self.loadHistory()
-
+        self.load_transactions()
+        self.setupSync()
+
+    def setupSync(self):
+        # Background sync runs only when a server is configured
+        url = self.settings.value('sync_url', '') or os.environ.get('SMART_CALC_SYNC_URL', '')
+        if not url:
+            return
+        self.sync_worker = SyncWorker(DEFAULT_DB_PATH, url, self.db_profile, parent=self)
+        self.sync_worker.progress.connect(
+            lambda sent, total: self.statusbar.showMessage(f"Syncing… {sent}/{total}"))
+        self.sync_worker.retrying.connect(
+            lambda attempt, delay, error: self.statusbar.showMessage(f"Sync failed, retrying in {delay:.0f}s: {error}"))
+        self.sync_worker.syncFinished.connect(self.onSyncFinished)
+        self.sync_worker.syncFailed.connect(lambda message: self.statusbar.showMessage(f"Sync failed: {message}"))
+        self.sync_worker.requestSync()
+
+    def onSyncFinished(self, report):
+        if report.changes or report.rows_applied:
+            self.statusbar.showMessage(f"Synced: {report.changes} sent, {report.rows_applied} received", 5000)
+        if report.rows_applied:
+            self.load_transactions()
+
+    def changesMade(self):
+        if self.sync_worker is not None:
+            self.sync_worker.requestSync()
+
+    def syncNow(self):
+        if self.sync_worker is None:
+            self.showError("No sync server configured")
+            return
+        self.sync_worker.dispatch()
+
+    def closeEvent(self, event):
+        if self.sync_worker is not None:
+            self.sync_worker.stop()
+        super().closeEvent(event)
+
+    @profiling.traced()
     def setupHamburgerMenu(self):
         self.menu = QMenu(self)
         
@@ -42,7 +98,12 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
         view_customers.triggered.connect(self.showCustomers)
         add_customer = customer_menu.addAction("Add Customer")
         add_customer.triggered.connect(self.addCustomer)
+        export_data = customer_menu.addAction("Export Data...")
+        export_data.triggered.connect(self.exportData)
         
+        sync_action = self.menu.addAction("Sync Now")
+        sync_action.triggered.connect(self.syncNow)
+
         # Theme
         theme_menu = self.menu.addMenu("Theme")
         light_theme = theme_menu.addAction("Light")
@@ -50,12 +111,24 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
         dark_theme = theme_menu.addAction("Dark")
         dark_theme.triggered.connect(lambda: self.setTheme("dark"))
         
+        # Arithmetic
+        arithmetic_menu = self.menu.addMenu("Arithmetic")
+        float_mode = arithmetic_menu.addAction("Floating Point")
+        float_mode.triggered.connect(lambda: self.setArithmeticMode("float"))
+        decimal_mode = arithmetic_menu.addAction("Exact Decimal")
+        decimal_mode.triggered.connect(lambda: self.setArithmeticMode("decimal"))
+        
+        # Database
+        profile_menu = self.menu.addMenu("Database Profile")
+        for profile in CONNECTION_PROFILES:
+            profile_action = profile_menu.addAction(profile.capitalize())
+            profile_action.triggered.connect(lambda checked, p=profile: self.setDatabaseProfile(p))
+        
         # About
         about_action = self.menu.addAction("About")
         about_action.triggered.connect(self.showAbout)
-        
-        self.btn_menu.clicked.connect(self.showMenu)
 
+    @profiling.traced()
     def setupKeyboardShortcuts(self):
         # Number keys
         for i in range(10):
@@ -66,6 +139,10 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
         self.addKeyboardShortcut("-", lambda: self.set_operation("-"))
         self.addKeyboardShortcut("*", lambda: self.set_operation("*"))
         self.addKeyboardShortcut("/", lambda: self.set_operation("/"))
+        self.addKeyboardShortcut("^", lambda: self.set_operation("^"))
+        self.addKeyboardShortcut("(", lambda: self.update_display("("))
+        self.addKeyboardShortcut(")", lambda: self.update_display(")"))
+        self.addKeyboardShortcut(".", lambda: self.update_display("."))
         self.addKeyboardShortcut("Return", self.calculate_result)
         self.addKeyboardShortcut("Enter", self.calculate_result)
         self.addKeyboardShortcut("Escape", self.clear_display)
@@ -84,51 +161,106 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
 
     def advanced_operation(self, op):
         try:
-            value = float(self.display.text())
-            result = 0
-            if op == "sqrt":
-                result = math.sqrt(value)
-            elif op == "pow":
-                result = value ** 2
-            elif op == "log":
-                result = math.log10(value)
-            self.display.setText(str(result))
-            self.addToHistory(f"{op}({value}) = {result}")
-        except ValueError:
-            self.showError("Invalid input for operation")
+            value = calc_engine.evaluate(self.display.text(), self.arithmetic_mode)
+            # Through the engine so the result keeps the arithmetic mode and
+            # errors carry the engine's messages
+            result = calc_engine.call(op, value, 2) if op == "pow" else calc_engine.call(op, value)
+            result = calc_engine.format_number(result)
+            self.display.setText(result)
+            self.addToHistory(f"{op}({calc_engine.format_number(value)}) = {result}", op)
         except Exception as e:
             self.showError(str(e))
 
     def showError(self, message):
         QMessageBox.critical(self, "Error", message)
 
-    def addToHistory(self, calculation):
-        self.history.append(calculation)
-        self.saveHistory()
-
-    def saveHistory(self):
-        self.settings.setValue('history', self.history[:100])  # Keep last 100 calculations
+    def addToHistory(self, calculation, operation='arithmetic'):
+        self.db.add_history(calculation, operation)
 
+    @profiling.traced()
     def loadHistory(self):
-        self.history = self.settings.value('history', [])
+        # History used to live in QSettings; move it into the database once
+        legacy = self.settings.value('history')
+        if legacy:
+            self.db.import_history([legacy] if isinstance(legacy, str) else legacy)
+        if legacy is not None:
+            self.settings.remove('history')
 
     def showHistory(self):
+        from models import HistoryListModel
+
         dialog = QDialog(self)
         dialog.setWindowTitle("Recent Calculations")
+        dialog.resize(480, 560)
         layout = QVBoxLayout()
-        list_widget = QListWidget()
-        list_widget.addItems(self.history)
-        layout.addWidget(list_widget)
+
+        search_input = QLineEdit()
+        search_input.setPlaceholderText("Search calculations")
+        layout.addWidget(search_input)
+
+        filters = QHBoxLayout()
+        operation_combo = QComboBox()
+        for label, operation in (("All operations", None), ("Arithmetic", 'arithmetic'),
+                                 ("Square root", 'sqrt'), ("Power", 'pow'), ("Logarithm", 'log')):
+            operation_combo.addItem(label, operation)
+        filters.addWidget(operation_combo)
+        date_check = QCheckBox("From")
+        filters.addWidget(date_check)
+        start_date = QDateEdit(QDate.currentDate().addMonths(-1))
+        end_date = QDateEdit(QDate.currentDate())
+        for date_edit in (start_date, end_date):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+            date_edit.setEnabled(False)
+        filters.addWidget(start_date)
+        filters.addWidget(QLabel("to"))
+        filters.addWidget(end_date)
+        layout.addLayout(filters)
+
+        # Rows are fetched a page at a time as the list scrolls
+        model = HistoryListModel(self.db, parent=dialog)
+        list_view = QListView()
+        list_view.setUniformItemSizes(True)
+        list_view.setModel(model)
+        layout.addWidget(list_view)
+
+        def utcBound(date, time):
+            # The picked days are local, but timestamps are stored in UTC
+            return QDateTime(date, time).toUTC().toString("yyyy-MM-dd HH:mm:ss")
+
+        def applyFilters():
+            use_dates = date_check.isChecked()
+            model.setFilters(
+                search_input.text(),
+                operation_combo.currentData(),
+                utcBound(start_date.date(), QTime(0, 0, 0)) if use_dates else None,
+                utcBound(end_date.date(), QTime(23, 59, 59)) if use_dates else None)
+
+        def toggleDates(checked):
+            start_date.setEnabled(checked)
+            end_date.setEnabled(checked)
+            applyFilters()
+
+        # Typing restarts the timer so a burst of keystrokes runs one search
+        search_timer = QTimer(dialog)
+        search_timer.setSingleShot(True)
+        search_timer.setInterval(200)
+        search_timer.timeout.connect(applyFilters)
+        search_input.textChanged.connect(search_timer.start)
+        operation_combo.currentIndexChanged.connect(applyFilters)
+        date_check.toggled.connect(toggleDates)
+        start_date.dateChanged.connect(applyFilters)
+        end_date.dateChanged.connect(applyFilters)
+
         clear_btn = QPushButton("Clear History")
-        clear_btn.clicked.connect(lambda: self.clearHistory(list_widget))
+        clear_btn.clicked.connect(lambda: self.clearHistory(model))
         layout.addWidget(clear_btn)
         dialog.setLayout(layout)
         dialog.exec_()
 
-    def clearHistory(self, list_widget):
-        self.history.clear()
-        self.saveHistory()
-        list_widget.clear()
+    def clearHistory(self, model):
+        self.db.clear_history()
+        model.refresh()
 
     def setTheme(self, theme):
         if theme == "dark":
@@ -141,10 +273,34 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
             self.setStyleSheet("")
         self.settings.setValue('theme', theme)
 
+    @profiling.traced()
     def loadTheme(self):
         theme = self.settings.value('theme', 'light')
         self.setTheme(theme)
 
+    def setArithmeticMode(self, mode):
+        self.arithmetic_mode = mode
+        self.settings.setValue('arithmetic_mode', mode)
+
+    def loadArithmeticMode(self):
+        mode = self.settings.value('arithmetic_mode', 'float')
+        self.setArithmeticMode(mode if mode in calc_engine.MODES else 'float')
+
+    def loadDatabaseProfile(self):
+        profile = self.settings.value('db_profile', DEFAULT_PROFILE)
+        return profile if profile in CONNECTION_PROFILES else DEFAULT_PROFILE
+
+    def setDatabaseProfile(self, profile):
+        if self._db is not None and not self._db.apply_profile(profile):
+            self.statusbar.showMessage(
+                f"Journal mode changes to {self._db.pending_journal_mode} after a restart", 5000)
+        self.db_profile = profile
+        self.customer_searcher.profile = profile
+        if self.sync_worker is not None:
+            self.sync_worker.profile = profile
+        self.settings.setValue('db_profile', profile)
+
+    @profiling.traced()
     def initUI(self):
         # Connect buttons to functions
         self.btn_0.clicked.connect(lambda: self.update_display("0"))
@@ -165,7 +321,7 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
         self.btn_equals.clicked.connect(self.calculate_result)
         self.btn_clear.clicked.connect(self.clear_display)
         self.btn_add_transaction.clicked.connect(self.add_transaction)
-        self.load_transactions()
+        self.btn_menu.clicked.connect(self.showMenu)
 
         # Add search field for customers
         self.customer_search_input = QLineEdit(self)
@@ -173,94 +329,112 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
         self.customer_search_input.textChanged.connect(self.searchCustomers)
         self.verticalLayout.addWidget(self.customer_search_input)
 
+        # Searches are debounced and run off the GUI thread
+        self.customer_searcher = CustomerSearcher(DEFAULT_DB_PATH, self.db_profile, parent=self)
+        self.customer_searcher.resultsReady.connect(self.showCustomerSearchResults)
+        self.customer_searcher.searchFailed.connect(self.showError)
+
         self.customer_list_widget = QListWidget(self)
         self.customer_list_widget.itemClicked.connect(self.selectCustomer)
         self.verticalLayout.addWidget(self.customer_list_widget)
 
     def update_display(self, value):
-        if self.display.text() == "0" and value != ".":
+        text = self.display.text()
+        if text in ("0", "Error") and value != ".":
             self.display.setText(value)
+        elif text == "Error":
+            self.display.setText("0" + value)
         else:
-            self.display.setText(self.display.text() + value)
+            self.display.setText(text + value)
 
     def set_operation(self, op):
-        if self.display.text():
-            self.first_operand = float(self.display.text())
-            self.current_input = ""
-            self.operation = op
-            self.display.setText("")
+        # The display holds the whole expression; operators are appended and
+        # a second operator in a row replaces the first, except for a minus
+        # that negates the next operand
+        text = self.display.text()
+        if not text or text == "Error":
+            return
+        if text[-1] in "+-*/^" and not (op == "-" and text[-1] in "*/^"):
+            text = text[:-1]
+        self.display.setText(text + op)
 
     def calculate_result(self):
-        if self.display.text() and self.first_operand is not None and self.operation:
-            second_operand = float(self.display.text())
-            result = 0
-            if self.operation == "+":
-                result = self.first_operand + second_operand
-            elif self.operation == "-":
-                result = self.first_operand - second_operand
-            elif self.operation == "*":
-                result = self.first_operand * second_operand
-            elif self.operation == "/":
-                result = self.first_operand / second_operand if second_operand != 0 else "Error"
-            self.display.setText(str(result))
-            self.first_operand = None
-            self.operation = None
+        expression = self.display.text()
+        if not expression or expression == "Error":
+            return
+        try:
+            result = calc_engine.format_number(calc_engine.evaluate(expression, self.arithmetic_mode))
+        except calc_engine.CalculationError as e:
+            self.display.setText("Error")
+            self.showError(str(e))
+            return
+        self.display.setText(result)
+        self.addToHistory(f"{expression} = {result}", calc_engine.operation_type(expression))
 
     def clear_display(self):
         self.display.setText("0")
-        self.first_operand = None
-        self.operation = None
 
     def add_transaction(self):
-        amount = float(self.display.text()) if self.display.text() else 0.0
         description = "Transaction Description"  # You can change this to get description from another input field if needed
-        self.db.add_transaction(amount, description)
+        try:
+            amount = calc_engine.evaluate(self.display.text(), self.arithmetic_mode) if self.display.text() else 0
+            self.db.add_transaction(amount, description)
+        except ValueError as e:  # includes CalculationError
+            self.showError(str(e))
+            return
+        self.changesMade()
         self.load_transactions()
         self.clear_display()
 
+    @profiling.traced()
     def load_transactions(self):
-        transactions = self.db.get_transactions()
         # Assuming you have a QListWidget named transaction_list in your UI
         if hasattr(self, 'transaction_list'):
+            transactions = self.db.get_transactions()
             self.transaction_list.clear()
             for trans in transactions:
                 item = f"{trans[1]} - {trans[2]} ({trans[3]})"
                 self.transaction_list.addItem(item)
 
     def showCustomers(self):
+        from models import ActionButtonsDelegate, CustomerTableModel
         dialog = QDialog(self)
         dialog.setWindowTitle("Customers")
         layout = QVBoxLayout()
-        table_widget = QTableWidget()
-        table_widget.setRowCount(0)
-        table_widget.setColumnCount(5)
-        table_widget.setHorizontalHeaderLabels(["ID", "Name", "Phone", "Email", "Actions"])
-        customers = self.db.get_customers()
-        for customer in customers:
-            row_position = table_widget.rowCount()
-            table_widget.insertRow(row_position)
-            for col, value in enumerate(customer):
-                table_widget.setItem(row_position, col, QTableWidgetItem(str(value)))
-            # Add action buttons for modify and delete
-            modify_btn = QPushButton("Modify")
-            modify_btn.clicked.connect(lambda checked, id=customer[0]: self.modifyCustomer(id))
-            delete_btn = QPushButton("Delete")
-            delete_btn.clicked.connect(lambda checked, id=customer[0]: self.deleteCustomer(id))
-            add_transaction_btn = QPushButton("Add Transaction")
-            add_transaction_btn.clicked.connect(lambda checked, id=customer[0]: self.addTransaction(id))
-            view_transactions_btn = QPushButton("View Transactions")
-            view_transactions_btn.clicked.connect(lambda checked, id=customer[0]: self.showCustomerTransactions(id))
-            table_widget.setCellWidget(row_position, 4, modify_btn)
-            table_widget.setCellWidget(row_position, 4, delete_btn)
-            table_widget.setCellWidget(row_position, 4, add_transaction_btn)
-            table_widget.setCellWidget(row_position, 4, view_transactions_btn)
-        layout.addWidget(table_widget)
+        model = CustomerTableModel(self.db, parent=dialog)
+        delegate = ActionButtonsDelegate([("modify", "Modify"), ("delete", "Delete"),
+                                          ("add_transaction", "Add Transaction"),
+                                          ("view_transactions", "View Transactions")], dialog)
+        delegate.actionTriggered.connect(lambda action, row: self.onCustomerAction(model, action, row))
+        table_view = QTableView()
+        table_view.setModel(model)
+        table_view.setItemDelegateForColumn(CustomerTableModel.ACTIONS_COLUMN, delegate)
+        table_view.setColumnWidth(CustomerTableModel.ACTIONS_COLUMN, delegate.preferredWidth(table_view.fontMetrics()))
+        # Fixed row heights keep the view from measuring every loaded row
+        table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        table_view.verticalHeader().hide()
+        layout.addWidget(table_view)
         add_btn = QPushButton("Add Customer")
         add_btn.clicked.connect(self.addCustomer)
+        add_btn.clicked.connect(model.refresh)
         layout.addWidget(add_btn)
         dialog.setLayout(layout)
+        dialog.resize(900, 500)
         dialog.exec_()
 
+    def onCustomerAction(self, model, action, row):
+        customer_id = model.customerId(row)
+        if action == "modify":
+            self.modifyCustomer(customer_id)
+            model.refresh()
+        elif action == "delete":
+            self.deleteCustomer(customer_id)
+            model.refresh()
+        elif action == "add_transaction":
+            self.addTransaction(customer_id)
+        elif action == "view_transactions":
+            self.showCustomerTransactions(customer_id)
+
     def modifyCustomer(self, customer_id):
         customer = self.db.get_customer(customer_id)
         dialog = QDialog(self)
@@ -283,10 +457,12 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
 
     def saveModifiedCustomer(self, customer_id, name, phone, email):
         self.db.update_customer(customer_id, name, phone, email, "")  # Address can be added later
+        self.changesMade()
         QMessageBox.information(self, "Success", "Customer modified successfully!")
 
     def deleteCustomer(self, customer_id):
         self.db.delete_customer(customer_id)
+        self.changesMade()
         QMessageBox.information(self, "Success", "Customer deleted successfully!")
 
     def addCustomer(self):
@@ -311,6 +487,7 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
     def saveCustomer(self, name, phone, email):
         if name and email:
             self.db.add_customer(name, phone, email, "")  # Address can be added later
+            self.changesMade()
             QMessageBox.information(self, "Success", "Customer added successfully!")
         else:
             QMessageBox.warning(self, "Error", "Name and Email are required fields.")
@@ -336,50 +513,104 @@ class CalculatorApp(QMainWindow, Ui_MainWindow):
 
     def saveTransaction(self, customer_id, amount, type, description):
         if type in ['credit', 'debit']:
-            self.db.add_customer_transaction(customer_id, float(amount), type, description)
+            try:
+                self.db.add_customer_transaction(customer_id, amount, type, description)
+            except ValueError as e:
+                QMessageBox.warning(self, "Error", str(e))
+                return
+            self.changesMade()
             QMessageBox.information(self, "Success", "Transaction added successfully!")
         else:
             QMessageBox.warning(self, "Error", "Transaction type must be 'credit' or 'debit'.")
 
     def showCustomerTransactions(self, customer_id):
+        from models import CustomerTransactionsModel
         dialog = QDialog(self)
-        dialog.setWindowTitle("Transaction History")
+        dialog.setWindowTitle(f"Transaction History (Balance: {self.db.get_balance(customer_id):.2f})")
         layout = QVBoxLayout()
-        table_widget = QTableWidget()
-        table_widget.setRowCount(0)
-        table_widget.setColumnCount(4)
-        table_widget.setHorizontalHeaderLabels(["ID", "Amount", "Type", "Description"])
-        transactions = self.db.get_customer_transactions(customer_id)
-        for transaction in transactions:
-            row_position = table_widget.rowCount()
-            table_widget.insertRow(row_position)
-            for col, value in enumerate(transaction):
-                table_widget.setItem(row_position, col, QTableWidgetItem(str(value)))
-        layout.addWidget(table_widget)
+        model = CustomerTransactionsModel(self.db, customer_id, parent=dialog)
+        table_view = QTableView()
+        table_view.setModel(model)
+        table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        table_view.verticalHeader().hide()
+        table_view.horizontalHeader().setSortIndicator(CustomerTransactionsModel.TIMESTAMP_COLUMN, Qt.DescendingOrder)
+        table_view.setSortingEnabled(True)
+        layout.addWidget(table_view)
         dialog.setLayout(layout)
+        dialog.resize(700, 500)
         dialog.exec_()
 
+    def exportData(self):
+        import data_io
+        filters = {"CSV (*.csv)": "csv", "JSON Lines (*.jsonl)": "jsonl", "Columnar JSON Lines (*.jsonl)": "columnar"}
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Export Data", "", ";;".join(filters))
+        if not path:
+            return
+        progress_dialog = QProgressDialog("Exporting...", None, 0, 100, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+
+        def report(written, total):
+            progress_dialog.setValue(written * 100 // total if total else 100)
+            QApplication.processEvents()
+
+        try:
+            written = data_io.export_data(self.db, path, filters[selected_filter], progress=report)
+        except (OSError, ValueError) as e:
+            self.showError(str(e))
+            return
+        finally:
+            progress_dialog.close()
+        QMessageBox.information(self, "Success", f"Exported {written} records.")
+
     def showAbout(self):
         QMessageBox.information(self, "About", "Smart Calculator")
 
     def showMenu(self):
+        if self.menu is None:
+            self.setupHamburgerMenu()
         self.menu.exec_(self.btn_menu.mapToGlobal(self.btn_menu.rect().bottomLeft()))
 
     def searchCustomers(self):
-        search_text = self.customer_search_input.text().lower()
+        self.customer_searcher.search(self.customer_search_input.text())
+
+    def showCustomerSearchResults(self, customers):
         self.customer_list_widget.clear()
-        customers = self.db.get_customers()
         for customer in customers:
-            if search_text in customer[1].lower():  # Assuming customer[1] is the name
-                self.customer_list_widget.addItem(f"{customer[1]} (ID: {customer[0]})")
+            self.customer_list_widget.addItem(f"{customer[1]} (ID: {customer[0]})")
 
     def selectCustomer(self, item):
         customer_id = int(item.text().split("(ID: ")[1][:-1])  # Extract ID from text
         self.current_customer_id = customer_id
         QMessageBox.information(self, "Customer Selected", f"Selected Customer ID: {customer_id}")
 
+class FirstPaintReporter(QObject):
+    # Marks the window's first paint in the trace and, with report, prints
+    # the time since process start (first line of this module); with
+    # quit_after the app exits right after
+    def __init__(self, report=True, quit_after=False, parent=None):
+        super().__init__(parent)
+        self.report = report
+        self.quit_after = quit_after
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            profiling.get_tracer().mark('first paint')
+            if self.report:
+                print(f"time-to-first-paint: {(time.perf_counter() - STARTED_AT) * 1000:.1f} ms", flush=True)
+            if self.quit_after:
+                QTimer.singleShot(0, QApplication.quit)
+        return False
+
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    window = CalculatorApp()
+    tracer = profiling.configure_from(sys.argv, origin=STARTED_AT)
+    tracer.add_phase('imports', STARTED_AT, time.perf_counter())
+    with tracer.phase('QApplication()'):
+        app = QApplication(sys.argv)
+    with tracer.phase('CalculatorApp()'):
+        window = CalculatorApp()
+    startup_time = '--startup-time' in sys.argv
+    if startup_time or tracer.enabled:
+        window.installEventFilter(FirstPaintReporter(report=startup_time, quit_after=startup_time, parent=window))
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,463 @@
+# Schema migrations for transactions.db.
+#
+# The schema version lives in PRAGMA user_version. Each migration moves the
+# database from version N to N + 1 and runs in its own transaction together
+# with the version bump, so a failed migration leaves the file untouched.
+# Append new migrations to MIGRATIONS; never edit or reorder released ones.
+
+def _create_base_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            amount REAL NOT NULL,
+            description TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            address TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customer_transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            amount REAL NOT NULL,
+            type TEXT CHECK(type IN ('credit', 'debit')),
+            description TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers (id)
+        )
+    ''')
+
+
+def _rebuild_legacy_transactions(cursor):
+    # Early databases created transactions without AUTOINCREMENT/NOT NULL
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='transactions'")
+    if 'AUTOINCREMENT' in cursor.fetchone()[0].upper():
+        return
+    cursor.execute('''
+        CREATE TABLE transactions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            amount REAL NOT NULL,
+            description TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO transactions_new (id, amount, description, timestamp)
+        SELECT id, COALESCE(amount, 0), description, timestamp FROM transactions
+    ''')
+    cursor.execute('DROP TABLE transactions')
+    cursor.execute('ALTER TABLE transactions_new RENAME TO transactions')
+
+
+def _create_query_indexes(cursor):
+    # Case-insensitive index used by search_customers for prefix lookups
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_customers_name_nocase
+        ON customers (name COLLATE NOCASE)
+    ''')
+
+    # History queries walk these newest-first; id breaks timestamp ties
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_customer_transactions_customer_timestamp
+        ON customer_transactions (customer_id, timestamp DESC, id DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_timestamp
+        ON transactions (timestamp DESC, id DESC)
+    ''')
+
+
+def _create_customer_balances(cursor):
+    # Running balance per customer (credits minus debits), kept in step with
+    # customer_transactions by triggers so every write path maintains it
+    cursor.execute('''
+        CREATE TABLE customer_balances (
+            customer_id INTEGER PRIMARY KEY,
+            balance REAL NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER customer_balances_after_insert
+        AFTER INSERT ON customer_transactions
+        WHEN NEW.customer_id IS NOT NULL
+        BEGIN
+            INSERT INTO customer_balances (customer_id, balance, transaction_count)
+            VALUES (NEW.customer_id, CASE NEW.type WHEN 'debit' THEN -NEW.amount ELSE NEW.amount END, 1)
+            ON CONFLICT (customer_id) DO UPDATE SET
+                balance = balance + excluded.balance,
+                transaction_count = transaction_count + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER customer_balances_after_delete
+        AFTER DELETE ON customer_transactions
+        WHEN OLD.customer_id IS NOT NULL
+        BEGIN
+            UPDATE customer_balances SET
+                balance = balance - CASE OLD.type WHEN 'debit' THEN -OLD.amount ELSE OLD.amount END,
+                transaction_count = transaction_count - 1
+            WHERE customer_id = OLD.customer_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER customer_balances_after_update
+        AFTER UPDATE OF customer_id, amount, type ON customer_transactions
+        BEGIN
+            UPDATE customer_balances SET
+                balance = balance - CASE OLD.type WHEN 'debit' THEN -OLD.amount ELSE OLD.amount END,
+                transaction_count = transaction_count - 1
+            WHERE customer_id = OLD.customer_id;
+            INSERT INTO customer_balances (customer_id, balance, transaction_count)
+            SELECT NEW.customer_id, CASE NEW.type WHEN 'debit' THEN -NEW.amount ELSE NEW.amount END, 1
+            WHERE NEW.customer_id IS NOT NULL
+            ON CONFLICT (customer_id) DO UPDATE SET
+                balance = balance + excluded.balance,
+                transaction_count = transaction_count + 1;
+        END
+    ''')
+    cursor.execute('''
+        INSERT INTO customer_balances (customer_id, balance, transaction_count)
+        SELECT customer_id, SUM(CASE type WHEN 'debit' THEN -amount ELSE amount END), COUNT(*)
+        FROM customer_transactions
+        WHERE customer_id IS NOT NULL
+        GROUP BY customer_id
+    ''')
+
+
+def _create_contact_indexes(cursor):
+    # Used by the bulk importer to match incoming customers to existing ones
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers (phone)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_customers_email ON customers (email)')
+
+
+def _store_amounts_in_cents(cursor):
+    # Money is stored exactly as integer minor units (amount_cents). The REAL
+    # amount/balance columns stay for existing readers and are derived from
+    # the cents on every write.
+    for table in ('transactions', 'customer_transactions'):
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN amount_cents INTEGER')
+        cursor.execute(f'UPDATE {table} SET amount_cents = CAST(ROUND(amount * 100) AS INTEGER)')
+        # Rows written without amount_cents (older code, raw SQL) get it filled in
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_fill_amount_cents
+            AFTER INSERT ON {table}
+            WHEN NEW.amount_cents IS NULL
+            BEGIN
+                UPDATE {table} SET amount_cents = CAST(ROUND(NEW.amount * 100) AS INTEGER)
+                WHERE id = NEW.id;
+            END
+        ''')
+
+    cursor.execute('ALTER TABLE customer_balances ADD COLUMN balance_cents INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('''
+        UPDATE customer_balances SET balance_cents = COALESCE((
+            SELECT SUM(CASE type WHEN 'debit' THEN -amount_cents ELSE amount_cents END)
+            FROM customer_transactions ct
+            WHERE ct.customer_id = customer_balances.customer_id
+        ), 0)
+    ''')
+    cursor.execute('UPDATE customer_balances SET balance = balance_cents / 100.0')
+
+    signed_new = ("CASE NEW.type WHEN 'debit' THEN -1 ELSE 1 END"
+                  " * COALESCE(NEW.amount_cents, CAST(ROUND(NEW.amount * 100) AS INTEGER))")
+    signed_old = ("CASE OLD.type WHEN 'debit' THEN -1 ELSE 1 END"
+                  " * COALESCE(OLD.amount_cents, CAST(ROUND(OLD.amount * 100) AS INTEGER))")
+    for trigger in ('insert', 'delete', 'update'):
+        cursor.execute(f'DROP TRIGGER customer_balances_after_{trigger}')
+    cursor.execute(f'''
+        CREATE TRIGGER customer_balances_after_insert
+        AFTER INSERT ON customer_transactions
+        WHEN NEW.customer_id IS NOT NULL
+        BEGIN
+            INSERT INTO customer_balances (customer_id, balance, balance_cents, transaction_count)
+            VALUES (NEW.customer_id, ({signed_new}) / 100.0, {signed_new}, 1)
+            ON CONFLICT (customer_id) DO UPDATE SET
+                balance = (balance_cents + excluded.balance_cents) / 100.0,
+                balance_cents = balance_cents + excluded.balance_cents,
+                transaction_count = transaction_count + 1;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER customer_balances_after_delete
+        AFTER DELETE ON customer_transactions
+        WHEN OLD.customer_id IS NOT NULL
+        BEGIN
+            UPDATE customer_balances SET
+                balance = (balance_cents - ({signed_old})) / 100.0,
+                balance_cents = balance_cents - ({signed_old}),
+                transaction_count = transaction_count - 1
+            WHERE customer_id = OLD.customer_id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER customer_balances_after_update
+        AFTER UPDATE OF customer_id, amount, amount_cents, type ON customer_transactions
+        BEGIN
+            UPDATE customer_balances SET
+                balance = (balance_cents - ({signed_old})) / 100.0,
+                balance_cents = balance_cents - ({signed_old}),
+                transaction_count = transaction_count - 1
+            WHERE customer_id = OLD.customer_id;
+            INSERT INTO customer_balances (customer_id, balance, balance_cents, transaction_count)
+            SELECT NEW.customer_id, ({signed_new}) / 100.0, {signed_new}, 1
+            WHERE NEW.customer_id IS NOT NULL
+            ON CONFLICT (customer_id) DO UPDATE SET
+                balance = (balance_cents + excluded.balance_cents) / 100.0,
+                balance_cents = balance_cents + excluded.balance_cents,
+                transaction_count = transaction_count + 1;
+        END
+    ''')
+
+
+# Tables mirrored to the sync server, in the order their changes are applied
+SYNCED_TABLES = ('customers', 'transactions', 'customer_transactions')
+
+
+def _create_change_log(cursor):
+    # Outbox for api_client's sync: every insert, update and delete on the
+    # synced tables appends (table, row id, op). The row contents are read at
+    # push time, so repeated edits of one row cost nothing extra to send.
+    cursor.execute('''
+        CREATE TABLE change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL CHECK(op IN ('insert', 'update', 'delete'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE sync_state (
+            key TEXT PRIMARY KEY,
+            value
+        )
+    ''')
+    cursor.execute("INSERT INTO sync_state (key, value) VALUES ('last_pushed_seq', 0)")
+    for table in SYNCED_TABLES:
+        for op, row in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+            cursor.execute(f'''
+                CREATE TRIGGER {table}_change_log_{op}
+                AFTER {op.upper()} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {row}.id, '{op}');
+                END
+            ''')
+        # Rows that existed before sync was introduced still have to reach
+        # the server once
+        cursor.execute(f"INSERT INTO change_log (table_name, row_id, op) SELECT '{table}', id, 'insert' FROM {table}")
+
+
+def _prepare_pull_sync(cursor):
+    # customers.updated_at decides conflicts when the server sends a newer or
+    # older version of a customer (last writer wins). Changes applied from
+    # the server run with sync_state.applying_remote = 1 inside the applying
+    # transaction, so they are not logged and pushed straight back.
+    cursor.execute('ALTER TABLE customers ADD COLUMN updated_at DATETIME')
+    cursor.execute('UPDATE customers SET updated_at = created_at')
+    cursor.execute("INSERT INTO sync_state (key, value) VALUES ('applying_remote', 0), ('pull_cursor', 0)")
+    for table in SYNCED_TABLES:
+        for op, row in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+            cursor.execute(f'DROP TRIGGER {table}_change_log_{op}')
+            cursor.execute(f'''
+                CREATE TRIGGER {table}_change_log_{op}
+                AFTER {op.upper()} ON {table}
+                WHEN (SELECT value FROM sync_state WHERE key = 'applying_remote') = 0
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {row}.id, '{op}');
+                END
+            ''')
+
+
+# Calculations kept in calculation_history; older ones are dropped on insert
+HISTORY_LIMIT = 1000
+
+
+def _create_calculation_history(cursor):
+    # Append-only calculator history. The trigger makes the table a ring
+    # buffer: each insert drops whatever fell out of the last HISTORY_LIMIT
+    # ids, which is a rowid range delete of (normally) one row.
+    cursor.execute('''
+        CREATE TABLE calculation_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_calculation_history_timestamp
+        ON calculation_history (timestamp DESC, id DESC)
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER calculation_history_retention
+        AFTER INSERT ON calculation_history
+        BEGIN
+            DELETE FROM calculation_history WHERE id <= NEW.id - {HISTORY_LIMIT};
+        END
+    ''')
+
+
+# With full-text search, history is kept far longer than the original ring
+SEARCHABLE_HISTORY_LIMIT = 1000000
+HISTORY_OPERATIONS = ('arithmetic', 'sqrt', 'pow', 'log')
+
+
+def _create_history_search(cursor):
+    # Operation type per calculation plus an external-content FTS5 index over
+    # the entry text, kept in step by triggers. Entries from the keypad's
+    # sqrt/pow/log buttons are written as "op(x) = y", which is how existing
+    # rows are classified.
+    cursor.execute("ALTER TABLE calculation_history ADD COLUMN operation TEXT NOT NULL DEFAULT 'arithmetic'")
+    for operation in HISTORY_OPERATIONS[1:]:
+        cursor.execute('UPDATE calculation_history SET operation = ? WHERE entry LIKE ?',
+                       (operation, operation + '(%'))
+    cursor.execute('''
+        CREATE INDEX idx_calculation_history_operation
+        ON calculation_history (operation, id)
+    ''')
+    # '.' is part of a token so 12.50 is indexed as one number; searches are
+    # prefix queries, so short prefixes get their own index
+    cursor.execute('''
+        CREATE VIRTUAL TABLE calculation_history_fts USING fts5(
+            entry,
+            content='calculation_history',
+            content_rowid='id',
+            tokenize="unicode61 tokenchars '.'",
+            prefix='1 2 3'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER calculation_history_fts_insert
+        AFTER INSERT ON calculation_history
+        BEGIN
+            INSERT INTO calculation_history_fts (rowid, entry) VALUES (NEW.id, NEW.entry);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER calculation_history_fts_delete
+        AFTER DELETE ON calculation_history
+        BEGIN
+            INSERT INTO calculation_history_fts (calculation_history_fts, rowid, entry)
+            VALUES ('delete', OLD.id, OLD.entry);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER calculation_history_fts_update
+        AFTER UPDATE OF entry ON calculation_history
+        BEGIN
+            INSERT INTO calculation_history_fts (calculation_history_fts, rowid, entry)
+            VALUES ('delete', OLD.id, OLD.entry);
+            INSERT INTO calculation_history_fts (rowid, entry) VALUES (NEW.id, NEW.entry);
+        END
+    ''')
+    cursor.execute("INSERT INTO calculation_history_fts (calculation_history_fts) VALUES ('rebuild')")
+    cursor.execute('DROP TRIGGER calculation_history_retention')
+    cursor.execute(f'''
+        CREATE TRIGGER calculation_history_retention
+        AFTER INSERT ON calculation_history
+        BEGIN
+            DELETE FROM calculation_history WHERE id <= NEW.id - {SEARCHABLE_HISTORY_LIMIT};
+        END
+    ''')
+
+
+def _create_sync_ids(cursor):
+    # Local ids collide across devices, so a synced row is identified by the
+    # device that created it and its id there. Rows created here need no
+    # entry (their identity is this device's id plus their own); rows pulled
+    # from another device are given a fresh local id and mapped here. Entries
+    # outlive the row so a local delete can still be pushed by identity.
+    cursor.execute('''
+        CREATE TABLE sync_ids (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            origin_device TEXT NOT NULL,
+            origin_id INTEGER NOT NULL,
+            PRIMARY KEY (table_name, row_id),
+            UNIQUE (table_name, origin_device, origin_id)
+        )
+    ''')
+
+
+def _gate_change_log(cursor):
+    # Without a sync server nothing ever acknowledges the change log, so it
+    # grew by a row per write forever. Logging is now off until a SyncClient
+    # is first created for the database (which turns it on and queues every
+    # existing row, as _create_change_log did), and off again while remote
+    # changes are applied; sync_state.log_changes replaces applying_remote.
+    # Databases that have synced before already have a device_id and keep
+    # logging.
+    cursor.execute('''
+        INSERT INTO sync_state (key, value)
+        SELECT 'log_changes', EXISTS (SELECT 1 FROM sync_state WHERE key = 'device_id')
+    ''')
+    cursor.execute("DELETE FROM sync_state WHERE key = 'applying_remote'")
+    cursor.execute("DELETE FROM change_log WHERE (SELECT value FROM sync_state WHERE key = 'log_changes') = 0")
+    for table in SYNCED_TABLES:
+        for op, row in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+            cursor.execute(f'DROP TRIGGER {table}_change_log_{op}')
+            cursor.execute(f'''
+                CREATE TRIGGER {table}_change_log_{op}
+                AFTER {op.upper()} ON {table}
+                WHEN (SELECT value FROM sync_state WHERE key = 'log_changes') = 1
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {row}.id, '{op}');
+                END
+            ''')
+
+
+MIGRATIONS = [
+    _create_base_tables,
+    _rebuild_legacy_transactions,
+    _create_query_indexes,
+    _create_customer_balances,
+    _create_contact_indexes,
+    _store_amounts_in_cents,
+    _create_change_log,
+    _prepare_pull_sync,
+    _create_calculation_history,
+    _create_history_search,
+    _create_sync_ids,
+    _gate_change_log,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    version = schema_version(conn)
+    if version > LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this application supports ({LATEST_VERSION})")
+
+    # Finish anything the caller left open so BEGIN starts a fresh transaction
+    conn.commit()
+    cursor = conn.cursor()
+    for target in range(version + 1, LATEST_VERSION + 1):
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have migrated while we waited for the lock
+            if schema_version(conn) >= target:
+                conn.rollback()
+                continue
+            MIGRATIONS[target - 1](cursor)
+            cursor.execute(f'PRAGMA user_version = {target}')
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    return schema_version(conn)
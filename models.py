@@ -0,0 +1,215 @@
+from PyQt5.QtCore import QAbstractListModel, QAbstractTableModel, QEvent, QModelIndex, QRect, Qt, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+
+
+class CustomerTableModel(QAbstractTableModel):
+    HEADERS = ["ID", "Name", "Phone", "Email", "Actions"]
+    ACTIONS_COLUMN = 4
+
+    def __init__(self, db, page_size=200, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.page_size = page_size
+        self.rows = []
+        self.cursor = None
+        self.exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole or index.column() == self.ACTIONS_COLUMN:
+            return None
+        value = self.rows[index.row()][index.column()]
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        # Called by the view as the user scrolls towards the last loaded row
+        if parent.isValid() or self.exhausted:
+            return
+        rows, self.cursor = self.db.get_customers_page(self.page_size, cursor=self.cursor)
+        self.exhausted = self.cursor is None
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def customerId(self, row):
+        return self.rows[row][0]
+
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = []
+        self.cursor = None
+        self.exhausted = False
+        self.endResetModel()
+
+
+class HistoryListModel(QAbstractListModel):
+    # Calculation history, newest first, matching the current filters and
+    # loaded a page at a time through DBManager.search_history
+    def __init__(self, db, page_size=200, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.page_size = page_size
+        self.filters = {}
+        self.rows = []
+        self.cursor = None
+        self.exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return row[1]
+        if role == Qt.ToolTipRole:
+            return f"{row[2]} · {row[3]}"
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        rows, self.cursor = self.db.search_history(page_size=self.page_size, cursor=self.cursor, **self.filters)
+        self.exhausted = self.cursor is None
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def setFilters(self, text=None, operation=None, start_timestamp=None, end_timestamp=None):
+        self.filters = {
+            'text': text,
+            'operation': operation,
+            'start_timestamp': start_timestamp,
+            'end_timestamp': end_timestamp,
+        }
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = []
+        self.cursor = None
+        self.exhausted = False
+        self.endResetModel()
+
+
+class CustomerTransactionsModel(QAbstractTableModel):
+    # (header, row index, DBManager sort column)
+    COLUMNS = [
+        ("ID", 0, 'id'),
+        ("Amount", 2, 'amount'),
+        ("Type", 3, 'type'),
+        ("Description", 4, 'description'),
+        ("Timestamp", 5, 'timestamp'),
+    ]
+    TIMESTAMP_COLUMN = 4
+
+    def __init__(self, db, customer_id, page_size=500, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.customer_id = customer_id
+        self.page_size = page_size
+        self.sort_column = 'timestamp'
+        self.descending = True
+        self.rows = []
+        self.cursor = None
+        self.exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self.rows[index.row()][self.COLUMNS[index.column()][1]]
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        rows, self.cursor = self.db.get_customer_transactions_page(
+            self.customer_id, self.page_size, cursor=self.cursor,
+            sort_column=self.sort_column, descending=self.descending)
+        self.exhausted = self.cursor is None
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # Sorting is done by SQLite: drop the loaded pages and restart the
+        # keyset walk in the new order
+        self.sort_column = self.COLUMNS[column][2]
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = []
+        self.cursor = None
+        self.exhausted = False
+        self.endResetModel()
+
+
+class ActionButtonsDelegate(QStyledItemDelegate):
+    # Paints a row of push buttons into a single cell instead of creating
+    # real widgets for every row; emits (action key, row) when one is clicked
+    actionTriggered = pyqtSignal(str, int)
+
+    def __init__(self, actions, parent=None):
+        super().__init__(parent)
+        self.actions = actions
+
+    def buttonRects(self, rect):
+        width = rect.width() // len(self.actions)
+        return [QRect(rect.left() + i * width, rect.top(), width, rect.height())
+                for i in range(len(self.actions))]
+
+    def preferredWidth(self, font_metrics):
+        return sum(font_metrics.horizontalAdvance(label) + 24 for _, label in self.actions)
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else QApplication.style()
+        for rect, (_, label) in zip(self.buttonRects(option.rect), self.actions):
+            button = QStyleOptionButton()
+            button.rect = rect.adjusted(2, 2, -2, -2)
+            button.text = label
+            button.state = QStyle.State_Enabled | QStyle.State_Raised
+            style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            for rect, (key, _) in zip(self.buttonRects(option.rect), self.actions):
+                if rect.contains(event.pos()):
+                    self.actionTriggered.emit(key, index.row())
+                    return True
+        return super().editorEvent(event, model, option, index)
@@ -0,0 +1,298 @@
+# Opt-in timing instrumentation that writes Chrome trace JSON (open it in
+# chrome://tracing or https://ui.perfetto.dev).
+#
+# Enable it with the SMART_CALC_TRACE environment variable or the --trace
+# command-line flag, both naming the output file:
+#
+#   SMART_CALC_TRACE=startup.json python main.py
+#   python main.py --trace startup.json
+#
+# While disabled, phase() and @traced cost one attribute check.
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_ENV = 'SMART_CALC_TRACE'
+
+
+class Tracer:
+    def __init__(self, path=None, origin=None):
+        self.path = path
+        self.origin = time.perf_counter() if origin is None else origin
+        self.events = []
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def _timestamp(self, moment):
+        return round((moment - self.origin) * 1_000_000, 1)
+
+    def add_phase(self, name, start, end, cpu_seconds=None, **args):
+        # Record an already-measured span; start/end are perf_counter() values
+        if not self.enabled:
+            return
+        if cpu_seconds is not None:
+            args['cpu_ms'] = round(cpu_seconds * 1000, 3)
+        event = {
+            'name': name,
+            'cat': 'phase',
+            'ph': 'X',
+            'ts': self._timestamp(start),
+            'dur': round((end - start) * 1_000_000, 1),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    @contextmanager
+    def phase(self, name, **args):
+        if not self.enabled:
+            yield
+            return
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, wall_start, time.perf_counter(), time.thread_time() - cpu_start, **args)
+
+    def mark(self, name, **args):
+        if not self.enabled:
+            return
+        event = {
+            'name': name,
+            'cat': 'mark',
+            'ph': 'i',
+            's': 'p',
+            'ts': self._timestamp(time.perf_counter()),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def save(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            events = list(self.events)
+        with open(self.path, 'w', encoding='utf-8') as handle:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, handle, indent=1)
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def enable(path, origin=None):
+    # Start recording into path; the trace is written when the process exits
+    global _tracer
+    _tracer = Tracer(path, origin)
+    atexit.register(_tracer.save)
+    return _tracer
+
+
+def configure_from(argv, environ=os.environ, origin=None):
+    # Enables tracing if --trace PATH (or --trace=PATH) is in argv or
+    # SMART_CALC_TRACE is set; the flag wins over the environment
+    path = environ.get(TRACE_ENV)
+    for i, arg in enumerate(argv):
+        if arg == '--trace' and i + 1 < len(argv):
+            path = argv[i + 1]
+        elif arg.startswith('--trace='):
+            path = arg.split('=', 1)[1]
+    if path:
+        return enable(path, origin)
+    return _tracer
+
+
+def traced(name=None):
+    # Decorator recording every call of the function as a phase
+    def decorate(function):
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return function(*args, **kwargs)
+            with _tracer.phase(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# DBManager query tracing
+#
+# Enabled with SMART_CALC_DB_TRACE: "1" prints a per-method summary to stderr
+# at exit, any other value is taken as a path and the summary is written
+# there as JSON. Calls slower than SMART_CALC_SLOW_QUERY_MS (default 50) are
+# logged on the smart_calculator.db logger together with the EXPLAIN QUERY
+# PLAN of every SELECT they ran.
+DB_TRACE_ENV = 'SMART_CALC_DB_TRACE'
+SLOW_QUERY_ENV = 'SMART_CALC_SLOW_QUERY_MS'
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float('inf'))
+# Methods that are not worth timing
+UNTRACED_METHODS = {'batch'}
+
+_db_logger = None
+
+
+class QueryStats:
+    def __init__(self, slow_ms=50.0):
+        self.slow_ms = slow_ms
+        self.methods = {}
+        self.lock = threading.Lock()
+
+    def record(self, method, caller, seconds, rows):
+        milliseconds = seconds * 1000
+        with self.lock:
+            entry = self.methods.get(method)
+            if entry is None:
+                entry = self.methods[method] = {
+                    'calls': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'histogram': [0] * len(LATENCY_BUCKETS_MS),
+                    'callers': {},
+                }
+            entry['calls'] += 1
+            entry['total_ms'] += milliseconds
+            entry['max_ms'] = max(entry['max_ms'], milliseconds)
+            entry['rows'] += rows
+            bucket = next(i for i, bound in enumerate(LATENCY_BUCKETS_MS) if milliseconds <= bound)
+            entry['histogram'][bucket] += 1
+            entry['callers'][caller] = entry['callers'].get(caller, 0) + 1
+
+    def summary(self):
+        with self.lock:
+            methods = {name: dict(entry, callers=dict(entry['callers'])) for name, entry in self.methods.items()}
+        return {
+            'slow_query_ms': self.slow_ms,
+            'latency_buckets_ms': [str(bound) for bound in LATENCY_BUCKETS_MS],
+            'methods': methods,
+        }
+
+    def format_summary(self):
+        lines = [f"{'method':<34}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}{'rows':>10}  top callers"]
+        for name, entry in sorted(self.summary()['methods'].items(), key=lambda item: -item[1]['total_ms']):
+            callers = sorted(entry['callers'].items(), key=lambda item: -item[1])[:3]
+            lines.append(f"{name:<34}{entry['calls']:>8}{entry['total_ms']:>12.1f}"
+                         f"{entry['total_ms'] / entry['calls']:>10.2f}{entry['max_ms']:>10.1f}{entry['rows']:>10}  "
+                         + ', '.join(f"{caller}×{count}" for caller, count in callers))
+        return '\n'.join(lines)
+
+
+_query_stats = None
+
+
+def _count_rows(result):
+    if isinstance(result, list):
+        return len(result)
+    # Paginated methods return (rows, cursor)
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, tuple):
+        return 1
+    return 0
+
+
+def _explain_slow_call(db, method, milliseconds, statements):
+    plans = []
+    for sql in statements:
+        if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            try:
+                plans.append(f"  {sql.strip()}\n    " + '\n    '.join(db.explain_query_plan(sql)))
+            except Exception as e:
+                plans.append(f"  {sql.strip()}\n    (no plan: {e})")
+    _db_logger.warning("slow DBManager.%s: %.1f ms\n%s", method, milliseconds, '\n'.join(plans))
+
+
+def instrument_db(db, stats=None):
+    # Wraps every public DBManager method on this instance to record call
+    # counts, latency and rows returned into stats (the shared process-wide
+    # QueryStats by default)
+    import inspect
+    import logging
+
+    global _db_logger
+    _db_logger = logging.getLogger('smart_calculator.db')
+    stats = stats or get_query_stats()
+    statements = []
+    tracing = {'depth': 0}
+
+    def capture(sql):
+        if tracing['depth']:
+            statements.append(sql)
+
+    db.conn.set_trace_callback(capture)
+
+    def wrap(name, method):
+        if inspect.isgeneratorfunction(getattr(type(db), name)):
+            @functools.wraps(method)
+            def generator_wrapper(*args, **kwargs):
+                caller = inspect.currentframe().f_back.f_code.co_name
+                start = time.perf_counter()
+                rows = 0
+                for chunk in method(*args, **kwargs):
+                    rows += len(chunk)
+                    yield chunk
+                stats.record(name, caller, time.perf_counter() - start, rows)
+            return generator_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            caller = inspect.currentframe().f_back.f_code.co_name
+            first_statement = len(statements)
+            tracing['depth'] += 1
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                tracing['depth'] -= 1
+            stats.record(name, caller, elapsed, _count_rows(result))
+            if elapsed * 1000 >= stats.slow_ms:
+                _explain_slow_call(db, name, elapsed * 1000, statements[first_statement:])
+            if not tracing['depth']:
+                statements.clear()
+            return result
+        return wrapper
+
+    for name, member in inspect.getmembers(type(db), inspect.isfunction):
+        if not name.startswith('_') and name not in UNTRACED_METHODS and name != 'explain_query_plan':
+            setattr(db, name, wrap(name, getattr(db, name)))
+    return db
+
+
+def get_query_stats():
+    global _query_stats
+    if _query_stats is None:
+        _query_stats = QueryStats(float(os.environ.get(SLOW_QUERY_ENV, 50)))
+        atexit.register(_dump_query_stats)
+    return _query_stats
+
+
+def _dump_query_stats():
+    target = os.environ.get(DB_TRACE_ENV)
+    if _query_stats is None or not _query_stats.methods:
+        return
+    if not target or target == '1':
+        import sys
+        print(_query_stats.format_summary(), file=sys.stderr)
+    else:
+        with open(target, 'w', encoding='utf-8') as handle:
+            json.dump(_query_stats.summary(), handle, indent=1)
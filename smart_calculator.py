@@ -0,0 +1,156 @@
+# Headless command-line entry point; never imports Qt.
+#
+#   python -m smart_calculator eval "12*(3+4)/7"
+#   echo "19.99*3" | python -m smart_calculator eval --decimal
+#   python -m smart_calculator add-transaction 12.50 -d "Coffee"
+#   python -m smart_calculator add-customer-transaction 7 100 credit
+#   python -m smart_calculator balance 7 8 9
+#   python -m smart_calculator verify-balances --rebuild
+#   python -m smart_calculator export customers.jsonl
+#   python -m smart_calculator import customers.jsonl
+#   python -m smart_calculator sync --url http://127.0.0.1:8765
+#
+# Heavier modules are imported inside the command that needs them, so a
+# plain "eval" stays well within a cron job or shell pipeline's budget.
+import argparse
+import sqlite3
+import sys
+
+
+def _open_db(args):
+    from db_manager import DBManager
+    return DBManager(args.db, args.profile)
+
+
+def cmd_eval(args):
+    import calc_engine
+    expressions = args.expressions or (line for line in sys.stdin if line.strip())
+    status = 0
+    for expression in expressions:
+        try:
+            print(calc_engine.format_number(calc_engine.evaluate(expression, args.mode)))
+        except calc_engine.CalculationError as e:
+            print(f"error: {expression.strip()}: {e}", file=sys.stderr)
+            status = 1
+    return status
+
+
+def cmd_add_transaction(args):
+    _open_db(args).add_transaction(args.amount, args.description)
+    return 0
+
+
+def cmd_add_customer_transaction(args):
+    _open_db(args).add_customer_transaction(args.customer_id, args.amount, args.type, args.description)
+    return 0
+
+
+def cmd_balance(args):
+    balances = _open_db(args).get_balances(args.customer_ids)
+    for customer_id, balance in balances.items():
+        print(f"{customer_id}\t{balance}")
+    return 0
+
+
+def cmd_verify_balances(args):
+    db = _open_db(args)
+    mismatches = db.verify_balances()
+    for customer_id, stored, ledger in mismatches:
+        print(f"{customer_id}\tstored={stored}\tledger={ledger}")
+    if mismatches and args.rebuild:
+        print(f"rebuilt {db.rebuild_balances()} balances", file=sys.stderr)
+        return 0
+    return 1 if mismatches else 0
+
+
+def cmd_export(args):
+    import data_io
+    written = data_io.export_data(_open_db(args), args.path, args.format)
+    print(f"exported {written} records", file=sys.stderr)
+    return 0
+
+
+def cmd_import(args):
+    import data_io
+    report = data_io.import_data(_open_db(args), args.path, args.format)
+    for error in report.errors:
+        print(error, file=sys.stderr)
+    print(f"imported {report.customers_inserted} customers ({report.customers_matched} matched), "
+          f"{report.transactions_inserted} transactions ({report.transactions_skipped} already present), "
+          f"{report.rejected} rejected "
+          f"in {report.elapsed:.2f}s ({report.rows_per_second:,.0f} rows/s)", file=sys.stderr)
+    return 0
+
+
+def cmd_sync(args):
+    import api_client
+    try:
+        report = api_client.sync_with_server(_open_db(args), args.url)
+    except api_client.SyncError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"pushed {report.changes} changes ({report.rows_sent} rows) in {report.batches} batches, "
+          f"{report.bytes_sent:,} bytes ({report.bytes_uncompressed:,} uncompressed); "
+          f"pulled {report.rows_received} rows in {report.pages} pages, {report.bytes_received:,} bytes, "
+          f"{report.rows_applied} applied, {report.conflicts} conflicts kept local "
+          f"in {report.elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='smart_calculator', description="Smart Calculator command line")
+    parser.add_argument('--db', default='transactions.db', help="database file (default: transactions.db)")
+    parser.add_argument('--profile', default='balanced', choices=('safe', 'balanced', 'fast'),
+                        help="connection profile (default: balanced)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('eval', help="evaluate expressions given as arguments or on stdin")
+    command.add_argument('expressions', nargs='*')
+    command.add_argument('--decimal', dest='mode', action='store_const', const='decimal', default='float',
+                         help="use exact decimal arithmetic")
+    command.set_defaults(handler=cmd_eval)
+
+    command = commands.add_parser('add-transaction', help="record a transaction")
+    command.add_argument('amount')
+    command.add_argument('-d', '--description', default='')
+    command.set_defaults(handler=cmd_add_transaction)
+
+    command = commands.add_parser('add-customer-transaction', help="record a customer ledger entry")
+    command.add_argument('customer_id', type=int)
+    command.add_argument('amount')
+    command.add_argument('type', choices=('credit', 'debit'))
+    command.add_argument('-d', '--description', default='')
+    command.set_defaults(handler=cmd_add_customer_transaction)
+
+    command = commands.add_parser('balance', help="print customer balances")
+    command.add_argument('customer_ids', type=int, nargs='+')
+    command.set_defaults(handler=cmd_balance)
+
+    command = commands.add_parser('verify-balances', help="check stored balances against the ledger")
+    command.add_argument('--rebuild', action='store_true', help="rebuild balances if any disagree")
+    command.set_defaults(handler=cmd_verify_balances)
+
+    for name, handler in (('export', cmd_export), ('import', cmd_import)):
+        command = commands.add_parser(name, help=f"{name} customers and ledgers")
+        command.add_argument('path')
+        command.add_argument('--format', choices=('csv', 'jsonl', 'columnar'))
+        command.set_defaults(handler=handler)
+
+    command = commands.add_parser('sync', help="push local changes to the sync server and pull remote ones")
+    command.add_argument('--url', help="server URL (default: $SMART_CALC_SYNC_URL)")
+    command.set_defaults(handler=cmd_sync)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# Local stand-in for the sync server, for development and for exercising
+# api_client against something real. Keeps everything in memory: the latest
+# version of every row, keyed by its origin (the device that created it and
+# its id there), plus a log of pushed changes that other devices pull.
+#
+#   python sync_server.py --port 8765
+#   SMART_CALC_SYNC_URL=http://127.0.0.1:8765 python -m smart_calculator sync
+#
+# Or in-process:
+#
+#   server = SyncServer(); server.start()
+#   SyncClient(db, server.url).push()
+#   server.stop()
+import argparse
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class SyncStore:
+    def __init__(self):
+        self.tables = {}
+        self.log = []
+        self.acked = {}
+        self.requests = 0
+        self.bytes_received = 0
+        # Answer this many upcoming pushes with 503, to exercise client retries
+        self.fail_requests = 0
+        self.lock = threading.Lock()
+
+    def apply_push(self, payload):
+        with self.lock:
+            device = payload['device_id']
+            for change in payload['changes']:
+                table = change['table']
+                rows = self.tables.setdefault(table, {})
+                for row in change['upserts']:
+                    origin = tuple(row['origin'])
+                    rows[origin] = row
+                    self.log.append((device, table, origin, row))
+                for origin in map(tuple, change['deletes']):
+                    rows.pop(origin, None)
+                    self.log.append((device, table, origin, None))
+            self.acked[device] = max(self.acked.get(device, 0), payload['to_seq'])
+            return self.acked[device]
+
+    def pull(self, since, limit, device):
+        # Changes after position since that other devices made, at most limit
+        # of them, with repeated changes to a row collapsed to the last one
+        with self.lock:
+            tables = {}
+            position = since
+            taken = 0
+            while position < len(self.log) and taken < limit:
+                pusher, table, origin, row = self.log[position]
+                position += 1
+                if pusher == device:
+                    continue
+                tables.setdefault(table, {})[origin] = row
+                taken += 1
+            changes = [{
+                'table': table,
+                'upserts': [row for row in rows.values() if row is not None],
+                'deletes': [list(origin) for origin, row in rows.items() if row is None],
+            } for table, rows in tables.items()]
+            return {'changes': changes, 'next_cursor': position, 'remaining': len(self.log) - position}
+
+    def status(self):
+        with self.lock:
+            return {
+                'tables': {table: len(rows) for table, rows in self.tables.items()},
+                'acked': dict(self.acked),
+                'requests': self.requests,
+                'bytes_received': self.bytes_received,
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to every kept-alive request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, value):
+        body = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        store = self.server.store
+        with store.lock:
+            store.requests += 1
+            store.bytes_received += len(body)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return json.loads(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/sync/status':
+            self.send_json(200, self.server.store.status())
+        elif url.path == '/sync/pull':
+            query = parse_qs(url.query)
+            try:
+                since = int(query.get('since', ['0'])[0])
+                limit = int(query.get('limit', ['1000'])[0])
+            except ValueError as e:
+                self.send_json(400, {'error': str(e)})
+                return
+            self.send_json(200, self.server.store.pull(since, limit, query.get('device_id', [''])[0]))
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        store = self.server.store
+        try:
+            # Always consume the body so the kept-alive connection stays usable
+            payload = self.read_json()
+        except (ValueError, OSError) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        if self.path != '/sync/push':
+            self.send_json(404, {'error': 'not found'})
+            return
+        with store.lock:
+            failing = store.fail_requests > 0
+            store.fail_requests -= failing
+        if failing:
+            self.send_json(503, {'error': 'unavailable'})
+            return
+        try:
+            acked = store.apply_push(payload)
+        except (KeyError, TypeError) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(200, {'acked_seq': acked})
+
+
+class SyncServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, verbose=False):
+        super().__init__((host, port), _Handler)
+        self.store = SyncStore()
+        self.verbose = verbose
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in sync server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    server = SyncServer(args.host, args.port, verbose=True)
+    print(f"Serving sync on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == '__main__':
+    main()
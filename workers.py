@@ -0,0 +1,188 @@
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from db_manager import DEFAULT_PROFILE, DBManager
+
+_local = threading.local()
+
+
+def _thread_db(db_path, profile):
+    # sqlite3 connections may only be used by the thread that opened them,
+    # so every worker thread keeps its own DBManager
+    db = getattr(_local, 'db', None)
+    if db is None or db.db_path != db_path:
+        db = DBManager(db_path, profile)
+        _local.db = db
+    elif db.profile != profile:
+        db.apply_profile(profile)
+    return db
+
+
+class _CustomerSearchTask(QRunnable):
+    def __init__(self, searcher, request_id, prefix):
+        super().__init__()
+        self.searcher = searcher
+        self.request_id = request_id
+        self.prefix = prefix
+
+    def run(self):
+        # A newer keystroke arrived while this task was queued
+        if self.request_id != self.searcher.request_id:
+            return
+        try:
+            rows = _thread_db(self.searcher.db_path, self.searcher.profile).search_customers(self.prefix, self.searcher.limit)
+        except Exception as e:
+            self.searcher.taskFailed.emit(self.request_id, str(e))
+            return
+        self.searcher.taskFinished.emit(self.request_id, rows)
+
+
+class CustomerSearcher(QObject):
+    resultsReady = pyqtSignal(list)
+    searchFailed = pyqtSignal(str)
+    taskFinished = pyqtSignal(int, list)
+    taskFailed = pyqtSignal(int, str)
+
+    def __init__(self, db_path, profile=DEFAULT_PROFILE, delay_ms=150, limit=50, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.profile = profile
+        self.limit = limit
+        self.request_id = 0
+        self.pending_text = ""
+
+        # One long-lived thread, so its connection is opened only once and
+        # queued searches run in order
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.pool.setExpiryTimeout(-1)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.dispatch)
+
+        self.taskFinished.connect(self.onTaskFinished)
+        self.taskFailed.connect(self.onTaskFailed)
+
+    def search(self, text):
+        # Bumping the request id invalidates every queued or running search
+        self.request_id += 1
+        self.pending_text = text.strip()
+        if not self.pending_text:
+            self.timer.stop()
+            self.resultsReady.emit([])
+            return
+        self.timer.start()
+
+    def dispatch(self):
+        self.pool.start(_CustomerSearchTask(self, self.request_id, self.pending_text))
+
+    def onTaskFinished(self, request_id, rows):
+        if request_id == self.request_id:
+            self.resultsReady.emit(rows)
+
+    def onTaskFailed(self, request_id, message):
+        if request_id == self.request_id:
+            self.searchFailed.emit(message)
+
+
+class _SyncTask(QRunnable):
+    def __init__(self, worker, client_kwargs):
+        super().__init__()
+        self.worker = worker
+        self.client_kwargs = client_kwargs
+
+    def run(self):
+        # Imported here so the network stack stays off the startup path
+        from api_client import SyncClient
+
+        worker = self.worker
+        try:
+            client = SyncClient(_thread_db(worker.db_path, worker.profile), worker.base_url, **self.client_kwargs)
+            client.on_retry = lambda attempt, delay, error: worker.retrying.emit(attempt, delay, str(error))
+            worker.client = client
+            report = client.sync(worker.progress.emit)
+        except Exception as e:
+            worker.taskFailed.emit(str(e))
+            return
+        finally:
+            worker.client = None
+        worker.taskFinished.emit(report)
+
+
+class SyncWorker(QObject):
+    # Pushes the change log to the sync server and pulls remote changes, off
+    # the GUI thread. Writes call requestSync(); changes made within delay_ms
+    # of each other go out as one sync, and a periodic sync catches anything
+    # written elsewhere.
+    progress = pyqtSignal(int, int)
+    retrying = pyqtSignal(int, float, str)
+    syncFinished = pyqtSignal(object)
+    syncFailed = pyqtSignal(str)
+    taskFinished = pyqtSignal(object)
+    taskFailed = pyqtSignal(str)
+
+    def __init__(self, db_path, base_url, profile=DEFAULT_PROFILE, delay_ms=2000, interval_ms=5 * 60 * 1000,
+                 parent=None, **client_kwargs):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.base_url = base_url
+        self.profile = profile
+        self.client_kwargs = client_kwargs
+        self.client = None
+        self.running = False
+        self.pending = False
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.pool.setExpiryTimeout(-1)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.dispatch)
+
+        self.periodic_timer = QTimer(self)
+        self.periodic_timer.setInterval(interval_ms)
+        self.periodic_timer.timeout.connect(self.requestSync)
+        self.periodic_timer.start()
+
+        self.taskFinished.connect(self.onTaskFinished)
+        self.taskFailed.connect(self.onTaskFailed)
+
+    def requestSync(self):
+        # Unlike the search debounce, later writes don't push the sync back,
+        # so a steady stream of edits still syncs every delay_ms
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def dispatch(self):
+        if self.running:
+            self.pending = True
+            return
+        self.running = True
+        self.pool.start(_SyncTask(self, self.client_kwargs))
+
+    def onTaskFinished(self, report):
+        self.running = False
+        self.syncFinished.emit(report)
+        if self.pending:
+            self.pending = False
+            self.requestSync()
+
+    def onTaskFailed(self, message):
+        self.running = False
+        self.pending = False
+        self.syncFailed.emit(message)
+
+    def stop(self, timeout_ms=3000):
+        # Stops scheduling, abandons any backoff wait and gives an in-flight
+        # request a moment to finish
+        self.timer.stop()
+        self.periodic_timer.stop()
+        client = self.client
+        if client is not None:
+            client.cancel()
+        self.pool.waitForDone(timeout_ms)